@@ -0,0 +1,208 @@
+import asyncio
+import io
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from prompt_privacy import (_prefiltered, _select_kinds, TagCache, anonymize, anonymize_file, anonymize_stream,
+                            get_tag_cache, load_mapping, register_detector, save_mapping, unregister_detector)
+from prompt_privacy_server import PrivacyServer
+from prompt_privacy_tenants import TenantRegistry
+from prompt_privacy_store import MappingStore
+from prompt_privacy_bench import EXPECTED_TAGS, check_regressions
+
+SECRET = b"0123456789abcdef0123456789abcdef"
+
+
+def kinds_of(result):
+    # (type, valeur) dans l'ordre du texte
+    return [(tag[2:-13], result.mapping[tag]) for tag in tags_in(result.text)]
+
+def tags_in(text):
+    return re.findall(r"\{\{[A-Z_]+_[A-Za-z0-9_-]{10}\}\}", text)
+
+
+# Chevauchements: le détecteur le plus prioritaire l'emporte, jamais un morceau de valeur ne fuit
+r = anonymize("voir https://ex.com/a?u=jean@ex.com", SECRET)
+assert kinds_of(r)[1:] == [("URL", "https://ex.com/a?u="), ("EMAIL", "jean@ex.com")]
+assert "ex.com" not in r.text
+
+r = anonymize("Contact: Jean Dupont jean@ex.com merci", SECRET)
+assert ("EMAIL", "jean@ex.com") in kinds_of(r)
+assert "@" not in r.text and "ex.com" not in r.text
+
+r = anonymize("Email john.doe@ex.com", SECRET)
+assert ("EMAIL", "john.doe@ex.com") in kinds_of(r)
+assert "doe" not in r.text
+
+# Les détecteurs spécifiques (IBAN, AHV, CLIENT_ID, INVOICE) l'emportent sur PHONE / PERSON_NAME / DATE
+for text, kind, value in EXPECTED_TAGS:
+    assert (kind, value) in kinds_of(anonymize(text, SECRET)), text
+r = anonymize("IBAN CH9300762011623852957, client CUST-004512, facture INV-2025-000123", SECRET)
+assert not re.search(r"CH93|004512|2025|000123", r.text)
+assert check_regressions(fuzz=500) == []
+
+# Zone re-cherchée: \b voit le vrai texte, un match sans rapport ailleurs ne change rien
+assert anonymize("Curie756.1234.5678.97", SECRET).text.startswith("Curie{{PHONE_")
+assert anonymize("voir https://ex.com/x Curie756.1234.5678.97", SECRET).text.endswith(
+    anonymize("Curie756.1234.5678.97", SECRET).text)
+
+# Les trois moteurs (str, fichier mmap, flux) donnent le même résultat
+text = "Appelez +41 79 123 45 67, ou jean@ex.com (https://ex.com/?u=jean@ex.com) le 2024-01-31.\n" * 50
+expected = anonymize(text, SECRET).text
+out = io.StringIO()
+anonymize_stream(io.StringIO(text), out, SECRET, chunk_size=300, overlap=100)
+assert out.getvalue() == expected
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "prompt.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    out = io.BytesIO()
+    anonymize_file(path, out, SECRET)
+    assert out.getvalue().decode("utf-8") == expected
+
+# Flux: un tag déjà présent coupé entre deux chunks est recopié intact (comparé au résultat en une fois)
+rnd = random.Random(1)
+tags = tags_in(anonymize(" ".join(f"u{i}@ex.com" for i in range(100)), SECRET).text)
+for _ in range(500):
+    text = "".join(rnd.choice(tags) if rnd.random() < 0.5 else rnd.choice((" ", "texte ", "\n", "42 "))
+                   for _ in range(rnd.randint(1, 60)))
+    chunk_size = rnd.randint(60, 150)
+    out = io.StringIO()
+    anonymize_stream(io.StringIO(text), out, SECRET, chunk_size=chunk_size, overlap=rnd.randint(30, chunk_size - 1))
+    assert out.getvalue() == anonymize(text, SECRET).text, (text, chunk_size)
+
+# Flux contre texte entier sur des PII collées les unes aux autres (chevauchements, matches
+# provisoires en fin de buffer); la fenêtre est plus longue que le plus long match
+pieces = ["Curie", "Jean Dupont", "756.1234.5678.97", "CH9300762011623852957", "CUST-004512",
+          "INV-2025-000123", "https://ex.com/a?u=", "jean@ex.com", "2025-09-09", "rue du Lac 12",
+          "+41 79 123 45 67", "0791234567", " ", "\n", ".", "-", "7", "12", "a", "x@"]
+for _ in range(3000):
+    text = "".join(rnd.choice(pieces) for _ in range(rnd.randint(1, 40)))
+    expected = anonymize(text, SECRET)
+    overlap = rnd.randint(1, 100) + max(map(len, expected.mapping.values()), default=0)
+    chunk_size = rnd.randint(overlap + 1, overlap + 150)
+    out = io.StringIO()
+    anonymize_stream(io.StringIO(text), out, SECRET, chunk_size=chunk_size, overlap=overlap)
+    assert out.getvalue() == expected.text, (text, chunk_size, overlap)
+
+# TagCache partagé entre threads (LRU plein: insertions et évictions concurrentes)
+cache = TagCache(SECRET, maxsize=100)
+switch = sys.getswitchinterval()
+sys.setswitchinterval(1e-6)  # changements de thread fréquents
+def tag_many(n):
+    get_tag_cache(bytes([n]) * 32)
+    return [cache.tag("EMAIL", f"u{i % 300}@ex.com") for i in range(20000)]
+with ThreadPoolExecutor(8) as pool:
+    results = list(pool.map(tag_many, range(8)))
+sys.setswitchinterval(switch)
+assert all(r == results[0] for r in results)
+assert len(cache.stats()) == 4 and cache.stats()["size"] == 100
+
+# MappingStore: deux écrivains sur le même fichier, aucune entrée perdue; conflit de seq = erreur
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "map.db")
+    with MappingStore(path, SECRET) as a, MappingStore(path, SECRET) as b:
+        assert a.update({"{{A_0000000001}}": "x"}) == 1
+        assert b.update({"{{B_0000000001}}": "y"}) == 1
+        assert a.update({"{{A_0000000002}}": "z", "{{B_0000000001}}": "y"}) == 1
+        assert b.verify() == 3 and b.get("{{A_0000000002}}") == "z"
+        b._db.execute("INSERT INTO entries VALUES (4, 'hors chaîne', 'v', 'mac')")
+        b._db.commit()
+        try:
+            a.update({"{{A_0000000003}}": "w"})
+            assert False
+        except sqlite3.IntegrityError:
+            pass
+        assert "{{A_0000000003}}" not in a
+
+# Serveur: le mapping JSON est sauvé pendant le service, pas seulement à l'arrêt
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "map.json")
+    server = PrivacyServer(SECRET, mapping_path=path, flush_interval=0.05)
+    server.anon({"text": "jean@ex.com"})
+    asyncio.run(server.flush())
+    assert load_mapping(path, SECRET) == server.mapping and len(server.mapping) == 1
+
+# Préfiltres: le littéral présent garde le détecteur, et son tag sort bien (pas évincé par PHONE / PERSON_NAME)
+for text, kind, value in (("Iban: CH9300762011623852957", "IBAN", "CH9300762011623852957"),
+                          ("avs 756.1234.5678.97", "AHV", "756.1234.5678.97"),
+                          ("réf. CUST-004512", "CLIENT_ID", "CUST-004512"),
+                          ("réf. INV-2025-000123", "INVOICE", "INV-2025-000123")):
+    assert kind in _prefiltered(_select_kinds(None, None), text)
+    assert kind not in _prefiltered(_select_kinds(None, None), text.replace(value, "0791234567"))
+    r = anonymize(text, SECRET)
+    assert kinds_of(r)[-1] == (kind, value) and value not in r.text, (text, kinds_of(r))
+
+# Serveur: un corps JSON mal typé donne une réponse 400, la connexion n'est pas coupée
+async def post(server, bodies):
+    listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+    statuses = []
+    for n, body in enumerate(bodies, 1):
+        close = "Connection: close\r\n" if n == len(bodies) else ""
+        writer.write(f"POST /anon HTTP/1.1\r\n{close}Content-Length: {len(body)}\r\n\r\n".encode() + body)
+        head = (await reader.readuntil(b"\r\n\r\n")).decode()
+        await reader.readexactly(int(re.search(r"Content-Length: (\d+)", head).group(1)))
+        statuses.append(int(head.split()[1]))
+    assert await reader.read() == b""   # fermée par le serveur après la dernière réponse
+    writer.close()
+    listener.close()
+    await listener.wait_closed()
+    return statuses
+bodies = [b'{"text": 5}', b'{"text": ["a"]}', b'[1]', b'{"text": "a", "include": "EMAIL"}', b'{"text": "jean@ex.com"}']
+server = PrivacyServer(SECRET)
+assert asyncio.run(post(server, bodies)) == [400, 400, 400, 400, 200]
+assert server.stats["/anon"].errors == 4
+
+# Détecteurs ajoutés: flags gardés (re.ASCII), références arrière et groupes nommés utilisables
+register_detector("DOUBLE", r"\b(\w+) \1\b", 5, flags=0)
+register_detector("REF", r"REF-(?P<n>\d+)-(?P=n)\b", 6, flags=0)
+register_detector("CODE", re.compile(r"\bX\w+", re.ASCII), 7)
+custom = ["DOUBLE", "REF", "CODE"]
+text = "le le chat REF-12-12 REF-12-13 Xéa Xab"
+r = anonymize(text, SECRET, include=custom)
+assert kinds_of(r) == [("DOUBLE", "le le"), ("REF", "REF-12-12"), ("CODE", "Xab")]
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "prompt.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("le le chat REF-12-12 REF-12-13 Xab")
+    out = io.BytesIO()
+    anonymize_file(path, out, SECRET, include=custom)  # chemin bytes (ASCII)
+    words = out.getvalue().decode("ascii").split()
+    assert words[1] == "chat" and words[3] == "REF-12-13" and len(tags_in(" ".join(words))) == 3
+for kind in custom:
+    unregister_detector(kind)
+
+# TenantRegistry: compteurs exacts sous requêtes concurrentes, avec et sans retraits (LRU)
+with tempfile.TemporaryDirectory() as tmp:
+    for max_tenants in (3, 2):
+        registry = TenantRegistry(lambda tenant: SECRET, mapping_dir=tmp, max_tenants=max_tenants,
+                                  flush_interval=0)
+        sys.setswitchinterval(1e-6)
+        def serve_tenant(n):
+            for i in range(200):
+                registry.anonymize(f"client{(n + i) % 3}", "jean@ex.com")
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(serve_tenant, range(8)))
+        sys.setswitchinterval(switch)
+        stats = registry.stats()
+        assert stats["loads"] - stats["evictions"] == stats["tenants"] == max_tenants
+        if max_tenants == 3:
+            assert stats["requests"] == 1600 and stats["bytes_in"] == 1600 * len("jean@ex.com")
+        registry.close()
+    assert sorted(os.listdir(tmp)) == ["client0.json", "client1.json", "client2.json"]
+    # Écriture ratée (valeur non sérialisable): l'ancien fichier reste, pas de .tmp laissé
+    path = os.path.join(tmp, "client0.json")
+    try:
+        save_mapping(path, {"{{X_0000000000}}": object()}, SECRET)
+        assert False
+    except TypeError:
+        pass
+    assert load_mapping(path, SECRET) and not os.path.exists(path + ".tmp")
+
+print("all test are ok")
@@ -5,12 +5,28 @@ Aucune dépendance externe. Python 3.9+ conseillé.
 Fonctions clés
 --------------
 - anonymize(text, secret, mode="placeholder"): remplace PII/identifiants par des tags stables {{TYPE_xxx}}.
-- deanonymize(text, mapping): restaure le texte original à partir d'un mapping.
+- anonymize_stream(reader, writer, secret): idem par chunks bornés, pour les gros fichiers.
+- anonymize_file(path, writer, secret): idem via mmap + regex bytes (fichiers ASCII sans copie str).
+- anonymize_many(items, secret, mapping=...): lots de textes/records JSONL sur un pool de processus.
+- anonymize_csv(reader, writer, secret, columns={"Email": ["EMAIL"]}): CSV en flux, détecteurs par colonne.
+- get_tag_cache(secret, maxsize): cache LRU des tags (HMAC pré-clé), partagé entre appels.
+- ResultCache(max_bytes, path): cache des résultats complets (anonymize(..., result_cache=...)),
+  mémoire + disque, pour les prompts système/templates répétés.
+- register_detector(kind, pattern, priority, prefilter, mask): ajoute un détecteur au registre DETECTORS;
+  profile_detectors(text) mesure le coût de chaque détecteur.
+- mask_values(kind, values): masque (style redact) toute une colonne de valeurs d'un même type.
+- deanonymize(text, mapping): restaure le texte original à partir d'un mapping (une seule passe).
+- deanonymize_stream(reader, writer, mapping): idem par chunks (gros fichiers).
+- Deanonymizer(mapping).feed(chunk)/flush(), deanonymize_iter(), adeanonymize(): restauration
+  incrémentale d'une réponse LLM token par token (sync ou async).
 - save_mapping(path, mapping, secret): sauvegarde le mapping signé (HMAC-SHA256) pour intégrité.
 - load_mapping(path, secret): recharge + vérifie l'intégrité du mapping.
+- prompt_privacy_store.MappingStore(path, secret): mapping sqlite en ajout seul (chaîne HMAC).
+- prompt_privacy_tenants.TenantRegistry(secrets, mapping_dir): secrets, caches de tags et mappings
+  par client (LRU, sauvegarde en arrière-plan, thread-safe).
 
-Couverture par défaut (adaptable)
----------------------------------
+Couverture par défaut (adaptable via register_detector)
+-------------------------------------------------------
 EMAIL, PHONE (y compris +41), IBAN (CH), AHV (AVS suisse), URL, PERSON_NAME (basique),
 CLIENT_ID (ex: CUST-123456), INVOICE (ex: INV-2025-000123), DATE (aaaa-mm-jj, dd.mm.yyyy),
 ADDRESS_HINT (mentions d'adresse simples: rue, avenue, ch., route… + numéro).
@@ -27,9 +43,37 @@ CLI
 Anonymiser un fichier (stdout) et sauver le mapping:
     python prompt_privacy.py anon --in input.txt --mapping map.json --secret-file .key
 
+Plusieurs fichiers en un seul processus (démarrage et compilation payés une fois):
+    python prompt_privacy.py anon --in docs/*.txt --out-dir anon/ --mapping map.json --secret-file .key
+
+Anonymiser un très gros fichier par chunks (mémoire bornée):
+    python prompt_privacy.py anon --stream --in dump.log --mapping map.json --secret-file .key
+
+Anonymiser un corpus JSONL en parallèle (champs title et body), mapping fusionné et signé:
+    python prompt_privacy.py anon-batch --in corpus.jsonl --out anon.jsonl --fields title,body \\
+        --mapping map.json --secret-file .key
+
+Anonymiser un CSV colonne par colonne (seuls les détecteurs indiqués sont appliqués):
+    python prompt_privacy.py anon-csv --in customers.csv --out anon.csv \\
+        --columns "Email=EMAIL,Phone 1=PHONE,Phone 2=PHONE" --typed "Last Name=PERSON_NAME" \\
+        --mapping map.json --secret-file .key
+
 Désanonymiser (stdout) en utilisant un mapping existant:
     python prompt_privacy.py deanon --in anon.txt --mapping map.json --secret-file .key
 
+Mapping persistant incrémental (sqlite): --mapping map.db, et pour reprendre un JSON existant:
+    python prompt_privacy.py store import --store map.db --json map.json --secret-file .key
+    python prompt_privacy.py store verify --store map.db --secret-file .key
+
+Serveur local (patterns, HMAC et mapping gardés en mémoire), voir prompt_privacy_server.py:
+    python prompt_privacy.py serve --port 8765 --mapping map.db --secret-file .key
+    (--result-cache-mb 64: les prompts identiques ne sont anonymisés qu'une fois)
+
+Mesurer les performances (JSON) et comparer à une référence, voir prompt_privacy_bench.py:
+    python prompt_privacy.py bench --sizes 0.1,1 --out bench.json
+    python prompt_privacy.py bench --baseline bench.json --profile cprofile
+    python prompt_privacy.py bench --startup    # démarrage à froid du CLI vs budget
+
 Générer une clé secrète (base64) pour les tags/HMAC:
     python prompt_privacy.py genkey > .key
 
@@ -42,50 +86,355 @@ API rapide
 """
 
 from __future__ import annotations
-from typing import Dict, Tuple, List, Pattern, Iterable
+from typing import Callable, Dict, Tuple, List, Pattern, Iterable, Iterator, TextIO, BinaryIO, Any, AsyncIterable, AsyncIterator
+import io
 import re
+import bisect
+import sys
 import hmac
 import hashlib
 import base64
 import json
+import threading
 import unicodedata
+import os
+import time
+from collections import deque, OrderedDict
+from collections.abc import Mapping
 from dataclasses import dataclass, field
+from functools import lru_cache
+# Importés à la demande (démarrage rapide du CLI): argparse, secrets, csv, mmap,
+# concurrent.futures, et les modules prompt_privacy_* (store, server, bench).
 
 
-# ---------------------------- Patterns ---------------------------------
+# ---------------------------- Détecteurs -------------------------------
 
+@lru_cache(maxsize=None)
 def _re(p: str, flags=re.IGNORECASE) -> Pattern[str]:
     return re.compile(p, flags)
 
-PATTERNS: Dict[str, Pattern[str]] = {
-    # E-mails
-    "EMAIL": _re(r"\b[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}\b"),
-    # Téléphones (accents, séparateurs, +41, formats FR/CH approximatifs)
-    "PHONE": _re(r"(?:\+?\s?4?1\s?[\s().-]?)?(?:0?\d[\s().-]?){8,}"),
-    # IBAN (CH…)
-    "IBAN": _re(r"\bCH\d{2}[A-Z0-9]{17}\b"),
-    # Numéro AVS/AHV Suisse (forme la plus courante: 756.XXXX.XXXX.XX ou 756XXXXXXXXXX)
-    "AHV": _re(r"\b756(?:[\s\.-]?\d){10}\b"),
-    # URL
-    "URL": _re(r"\bhttps?://[^\s)]+"),
-    # Noms très basiques (Capitalisé(s)), évite les mots trop courts
-    "PERSON_NAME": _re(r"\b([A-Z][a-z]{2,}(?:\s+[A-Z][a-z]{2,}){0,2})\b"),
-    # IDs métiers (modifiez selon vos conventions)
-    "CLIENT_ID": _re(r"\bCUST-\d{4,}\b"),
-    "INVOICE": _re(r"\bINV-[0-9]{4}-[0-9]{3,}\b"),
-    # Dates usuelles (ajoutez-en d'autres si besoin)
-    "DATE": _re(r"\b(?:\d{4}-\d{2}-\d{2}|\d{2}\.\d{2}\.\d{4})\b"),
-    # Adresse rudimentaire (rue/av./route/ch.), très heuristique
-    "ADDRESS_HINT": _re(r"\b(?:(?:rue|avenue|av\.?|route|rt\.?|chemin|ch\.?)\s+[A-Za-zÀ-ÖØ-öø-ÿ'’.-]+(?:\s+\d{1,4}[A-Za-z]?)?)\b"),
-}
+@dataclass(frozen=True)
+class Detector:
+    """
+    Un type de donnée à anonymiser.
+    - source/flags: la regex, compilée seulement au premier accès à `pattern` (ou au premier
+      texte qui l'évalue: un détecteur jamais utilisé n'est jamais compilé).
+    - priority: si deux matches se chevauchent, la plus petite valeur l'emporte.
+    - prefilter: littéraux (minuscules) dont au moins un doit apparaître dans le texte
+      (comparaison insensible à la casse) pour que le détecteur soit évalué; () = toujours.
+    """
+    kind: str
+    source: str
+    flags: int
+    priority: int
+    prefilter: Tuple[str, ...] = ()
+
+    @property
+    def pattern(self) -> Pattern[str]:
+        return _re(self.source, self.flags)
+
+class _PatternView(Mapping):
+    # Vue en lecture seule kind -> regex (compatibilité), dans l'ordre des priorités;
+    # chaque regex n'est compilée qu'à la lecture
+    def __getitem__(self, kind: str) -> Pattern[str]:
+        return DETECTORS[kind].pattern
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_ORDER)
+
+    def __len__(self) -> int:
+        return len(_ORDER)
+
+# Registre des détecteurs (kind -> Detector). Utilisez register_detector() pour l'étendre.
+DETECTORS: Dict[str, Detector] = {}
+_ORDER: List[str] = []  # kinds triés par priorité
+PATTERNS = _PatternView()
+
+_KIND_RX = re.compile(r"[A-Z][A-Z0-9_]*")
+_DIGITS = tuple("0123456789")
+
+def register_detector(kind: str, pattern: str | Pattern[str], priority: int | None = None,
+                      prefilter: Iterable[str] = (), flags=re.IGNORECASE,
+                      mask: Callable[[str], str] | None = None) -> Detector:
+    """
+    Ajoute (ou remplace) un détecteur. `kind` en MAJUSCULES ([A-Z][A-Z0-9_]*) car il fait
+    partie du tag. Sans priorité, le détecteur passe après tous les autres.
+    Un pattern str n'est pas compilé ici (voir Detector.pattern).
+    - mask: masque du mode redact pour ce type (voir MASKERS); à déclarer au démarrage,
+      seuls les caches de get_tag_cache() sont vidés.
+    """
+    if not _KIND_RX.fullmatch(kind):
+        raise ValueError(f"kind invalide: {kind!r} (attendu: [A-Z][A-Z0-9_]*)")
+    if isinstance(pattern, re.Pattern):
+        pattern, flags = pattern.pattern, pattern.flags
+    if priority is None:
+        priority = max((d.priority for d in DETECTORS.values()), default=0) + 10
+    det = Detector(kind, pattern, flags, priority, tuple(p.lower() for p in prefilter))
+    DETECTORS[kind] = det
+    if mask is not None:
+        MASKERS[kind] = mask
+        with _TAG_CACHES_LOCK:
+            caches = list(_TAG_CACHES.values())
+        for cache in caches:
+            cache.clear()
+    _registry_changed()
+    return det
+
+def unregister_detector(kind: str) -> None:
+    del DETECTORS[kind]
+    _registry_changed()
+
+def _registry_changed() -> None:
+    _ORDER[:] = sorted(DETECTORS, key=lambda k: DETECTORS[k].priority)
+    _REGISTRY_STATE["fingerprint"] = None
+
+# Empreinte du registre (invalide les résultats mis en cache quand un détecteur change)
+_REGISTRY_STATE: Dict[str, str | None] = {"fingerprint": None}
+
+def _registry_fingerprint() -> str:
+    fp = _REGISTRY_STATE["fingerprint"]
+    if fp is None:
+        desc = repr(sorted((d.kind, d.source, int(d.flags), d.priority,
+                            getattr(MASKERS.get(d.kind), "__qualname__", None))
+                           for d in DETECTORS.values()))
+        fp = _REGISTRY_STATE["fingerprint"] = hashlib.sha256(desc.encode("utf-8")).hexdigest()
+    return fp
+
+# Priorités: d'abord les détecteurs spécifiques (préfixe ou forme fixe), puis les génériques
+# (PHONE, PERSON_NAME, DATE, ADDRESS_HINT) qui matchent aussi des morceaux des premiers
+# ("CH93..." contient 8 chiffres, "CUST"/"INV" ressemblent à des noms).
+# E-mails
+register_detector("EMAIL", r"\b[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}\b", 10, prefilter=("@",))
+# IBAN (CH…)
+register_detector("IBAN", r"\bCH\d{2}[A-Z0-9]{17}\b", 20, prefilter=("ch",))
+# Numéro AVS/AHV Suisse (forme la plus courante: 756.XXXX.XXXX.XX ou 756XXXXXXXXXX)
+register_detector("AHV", r"\b756(?:[\s\.-]?\d){10}\b", 30, prefilter=("756",))
+# IDs métiers (modifiez selon vos conventions)
+register_detector("CLIENT_ID", r"\bCUST-\d{4,}\b", 40, prefilter=("cust-",))
+register_detector("INVOICE", r"\bINV-[0-9]{4}-[0-9]{3,}\b", 50, prefilter=("inv-",))
+# URL
+register_detector("URL", r"\bhttps?://[^\s)]+", 60, prefilter=("http",))
+# Téléphones (accents, séparateurs, +41, formats FR/CH approximatifs).
+# Temps linéaire: une seule façon de découper chaque chiffre/séparateur (pas de "0?\d"
+# ni de "\s?[\s...]?" ambigus), donc un échec ne revient en arrière que sur < 8 chiffres.
+register_detector("PHONE", r"(?:\+?\s?4?1(?:\s[\s().-]?|[().-])?)?(?:\d[\s().-]?){8,}", 70, prefilter=_DIGITS)
+# Noms très basiques (Capitalisé(s)), évite les mots trop courts
+register_detector("PERSON_NAME", r"\b([A-Z][a-z]{2,}(?:\s+[A-Z][a-z]{2,}){0,2})\b", 80)
+# Dates usuelles (ajoutez-en d'autres si besoin)
+register_detector("DATE", r"\b(?:\d{4}-\d{2}-\d{2}|\d{2}\.\d{2}\.\d{4})\b", 90, prefilter=_DIGITS)
+# Adresse rudimentaire (rue/av./route/ch.), très heuristique.
+# Temps linéaire: mots-clés factorisés, et la classe du nom de rue exclut les espaces, donc
+# chaque caractère n'est relu que par le mot-clé qui le précède.
+register_detector("ADDRESS_HINT", r"\b(?:r(?:ue|oute|t\.?)|av(?:enue|\.)?|ch(?:emin|\.)?)\s+[A-Za-zÀ-ÖØ-öø-ÿ'’.-]+(?:\s+\d{1,4}[A-Za-z]?)?\b",
+                  100, prefilter=("rue", "av", "route", "rt", "ch"))
+
+
+# ------------------------ Résolution des matches ------------------------
+
+# Tag déjà présent dans le texte ({{KIND_token}}): recopié tel quel, jamais re-taggé.
+_TAG_PATTERN = r"\{\{[A-Z][A-Z0-9_]*_[A-Za-z0-9_-]{10}\}\}"
+_TAG_GROUP = "TAG"
+_TAG_RX = re.compile(_TAG_PATTERN)
+
+def _sources(kinds: Iterable[str]) -> Tuple[Tuple[str, str, int], ...]:
+    # Clé des caches de patterns: (kind, source, flags) des détecteurs, dans l'ordre donné
+    return tuple((k, DETECTORS[k].source, int(DETECTORS[k].flags)) for k in kinds)
+
+@lru_cache(maxsize=64)
+def _compile_patterns(detectors: Tuple[Tuple[str, str, int], ...]) -> Tuple[Tuple[str, Pattern[str]], ...]:
+    # (kind, regex) dans l'ordre des priorités, précédé des tags déjà présents
+    return ((_TAG_GROUP, _TAG_RX),) + tuple((kind, _re(source, flags)) for kind, source, flags in detectors)
+
+def _spans(text, patterns, start: int = 0) -> List[Tuple[int, int, str]]:
+    """
+    Matches retenus dans text[start:] (str ou bytes), triés: [(début, fin, kind), ...].
+    Chevauchements résolus par priorité, comme l'ancien rx.sub() par type: chaque détecteur
+    (ordre de `patterns`) ne cherche que dans les zones laissées libres par les précédents,
+    un match de priorité plus faible ne peut donc jamais entamer un match plus prioritaire.
+    Une passe sur tout le texte par détecteur; seules les zones qu'un match a traversées
+    (il chevauchait une zone prise) sont recherchées à nouveau, depuis le début de la zone
+    et sur le texte complet (\b et les lookaheads voient les vrais voisins, pas une fin de
+    chaîne artificielle). Seulement à partir d'un match qui déborde sur la zone prise
+    suivante, la recherche est bornée à la zone libre (cette zone deviendra un tag, "{{":
+    la limite de mot y existe). Le résultat ne dépend que du texte et des matches plus
+    prioritaires, jamais d'un match sans rapport ailleurs dans le texte.
+    """
+    return _resolve(text, patterns, start, False)[0]
+
+def _resolve(text, patterns, start: int, open_end: bool) -> Tuple[List[Tuple[int, int, str]], int]:
+    """
+    Moteur de _spans(). open_end (streaming, le texte continue après text): un match qui
+    touche la fin de text est provisoire, il est écarté AVANT la résolution (il ne doit pas
+    évincer un match moins prioritaire qui existe dans le texte complet).
+    Retour: (spans, début du premier match écarté, ou len(text) s'il n'y en a pas).
+    """
+    spans: List[Tuple[int, int, str]] = []
+    end = len(text)
+    tail = end if open_end else -1   # fin des matches provisoires
+    held = end
+    for kind, rx in patterns:
+        if not spans:
+            for m in rx.finditer(text, start):
+                s, e = m.span()
+                if e == tail:
+                    held = min(held, s)
+                elif s < e:
+                    spans.append((s, e, kind))
+            continue
+        starts = [sp[0] for sp in spans]
+        ends = [sp[1] for sp in spans]
+        n = len(spans)
+        found = []
+        gaps = []
+        dirty = set()  # zone libre i = entre spans[i - 1] et spans[i]
+        for m in rx.finditer(text, start):
+            s, e = m.span()
+            if e == tail:
+                held = min(held, s)
+                continue
+            i = bisect.bisect_right(starts, s)
+            if (i == 0 or ends[i - 1] <= s) and (i == n or e <= starts[i]):
+                if s < e:
+                    found.append((s, e, kind))
+                    gaps.append(i)
+            else:
+                dirty.update(range(i, bisect.bisect_left(starts, e) + 1))
+        if dirty:
+            found = [f for f, i in zip(found, gaps) if i not in dirty]
+            for i in sorted(dirty):
+                gs = ends[i - 1] if i else start
+                ge = starts[i] if i < n else end
+                if gs < ge:
+                    for m in rx.finditer(text, gs):
+                        s, e = m.span()
+                        if s >= ge:
+                            break
+                        if e == tail:
+                            held = min(held, s)
+                            break
+                        if e > ge:
+                            # Déborde sur la zone prise: cherché à nouveau, borné à la zone
+                            found.extend((m.start(), m.end(), kind) for m in rx.finditer(text, s, ge)
+                                         if m.end() > m.start())
+                            break
+                        if s < e:
+                            found.append((s, e, kind))
+        if found:
+            spans.extend(found)
+            spans.sort()
+    return spans, held
+
+def _select_kinds(include: Iterable[str] | None, exclude: Iterable[str] | None) -> List[str]:
+    # Types actifs, triés par priorité
+    kinds = list(_ORDER)
+    if include:
+        include_set = set(include)
+        kinds = [k for k in kinds if k in include_set]
+    if exclude:
+        exclude_set = set(exclude)
+        kinds = [k for k in kinds if k not in exclude_set]
+    return kinds
+
+def _prefiltered(kinds: List[str], text: str) -> List[str]:
+    # Retire les détecteurs dont aucun littéral de préfiltre n'apparaît dans le texte
+    low = None
+    kept = []
+    for kind in kinds:
+        lits = DETECTORS[kind].prefilter
+        if lits:
+            if low is None:
+                low = text.lower()
+            if not any(lit in low for lit in lits):
+                continue
+        kept.append(kind)
+    return kept
+
+def _patterns(kinds: Iterable[str]) -> Tuple[Tuple[str, Pattern[str]], ...]:
+    return _compile_patterns(_sources(kinds))
+
+
+# ------------------------ Matcher bytes (ASCII) -------------------------
+
+def _ascii_pattern(p: str) -> str | None:
+    """
+    Version ASCII d'un pattern pour une regex bytes, valable sur une entrée 100% ASCII:
+    les caractères/plages non-ASCII des classes [...] sont retirés (ils ne peuvent pas matcher).
+    None si un caractère non-ASCII apparaît hors d'une classe.
+    """
+    out: List[str] = []
+    i, n = 0, len(p)
+    class_start = -1  # position du premier caractère de la classe courante, -1 hors classe
+    while i < n:
+        c = p[i]
+        if c == "\\":
+            out.append(p[i:i + 2])
+            i += 2
+            continue
+        if class_start < 0:
+            if not c.isascii():
+                return None
+            out.append(c)
+            if c == "[":
+                class_start = i + 1 + (p[i + 1:i + 2] == "^")
+                if class_start > i + 1:
+                    out.append("^")
+                    i += 1
+            i += 1
+            continue
+        if c == "]" and i > class_start:
+            class_start = -1
+            out.append(c)
+            i += 1
+            continue
+        is_range = i + 2 < n and p[i + 1] == "-" and p[i + 2] != "]"
+        if not c.isascii():
+            i += 3 if is_range else 1
+        elif is_range and not p[i + 2].isascii():
+            out.append(c + "-\\x7f")
+            i += 3
+        else:
+            out.append(c)
+            i += 1
+    return "".join(out)
+
+_TAG_BYTES_RX = re.compile(_TAG_PATTERN.encode("ascii"))
+
+@lru_cache(maxsize=64)
+def _compile_bytes_patterns(detectors: Tuple[Tuple[str, str, int], ...]):
+    # Comme _compile_patterns(), en regex bytes; None si un pattern n'est pas convertible
+    patterns = [(_TAG_GROUP, _TAG_BYTES_RX)]
+    for kind, source, flags in detectors:
+        ascii_p = _ascii_pattern(source)
+        if ascii_p is None:
+            return None
+        try:
+            patterns.append((kind, re.compile(ascii_p.encode("ascii"), flags & ~(re.UNICODE | re.ASCII))))
+        except re.error:
+            return None
+    return tuple(patterns)
+
+@lru_cache(maxsize=256)
+def _bytes_prefilter(kind: str, lits: Tuple[str, ...]) -> Pattern[bytes]:
+    return re.compile("|".join(re.escape(lit) for lit in lits).encode("utf-8"), re.IGNORECASE)
+
+def _prefiltered_bytes(kinds: List[str], buf) -> List[str]:
+    kept = []
+    for kind in kinds:
+        lits = DETECTORS[kind].prefilter
+        if lits and not _bytes_prefilter(kind, lits).search(buf):
+            continue
+        kept.append(kind)
+    return kept
 
 
 # ------------------------ Core anonymization ----------------------------
 
 def _normalize(s: str) -> str:
-    # Normalise unicode et espaces
-    s = unicodedata.normalize("NFC", s)
-    s = s.replace("\r\n", "\n").replace("\r", "\n")
+    # Normalise unicode et espaces; un texte ASCII est déjà NFC, et sans "\r" pas de replace
+    if not s.isascii():
+        s = unicodedata.normalize("NFC", s)
+    if "\r" in s:
+        s = s.replace("\r\n", "\n").replace("\r", "\n")
     return s
 
 def _stable_tag(secret: bytes, kind: str, value: str) -> str:
@@ -93,84 +442,490 @@ def _stable_tag(secret: bytes, kind: str, value: str) -> str:
     token = base64.urlsafe_b64encode(digest)[:10].decode("ascii")
     return f"{{{{{kind}_{token}}}}}"
 
+# Taille par défaut du cache de tags (entrées (kind, valeur) par secret)
+TAG_CACHE_SIZE = 65536
+
+class TagCache:
+    """
+    Cache LRU des tags d'UN secret: (kind, valeur) -> tag, identique à _stable_tag().
+    Le HMAC est pré-clé une seule fois puis copié pour chaque nouvelle valeur.
+    En mode redact, le remplacement "tag(masque)" est gardé dans la même entrée.
+    Thread-safe: l'accès aux entrées est protégé par un verrou (partagé entre threads par
+    get_tag_cache()).
+    """
+
+    def __init__(self, secret: bytes, maxsize: int = TAG_CACHE_SIZE):
+        self._hmac = hmac.new(secret, digestmod=hashlib.sha256)
+        self._entries: OrderedDict[str, List[str | None]] = OrderedDict()  # [tag, tag(masque)]
+        self._lock = threading.Lock()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, kind: str, value: str) -> List[str | None]:
+        key = kind + ":" + value  # = message HMAC
+        entries = self._entries
+        with self._lock:
+            entry = entries.get(key)
+            if entry is not None:
+                entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            h = self._hmac.copy()
+            h.update(key.encode("utf-8"))
+            token = base64.urlsafe_b64encode(h.digest())[:10].decode("ascii")
+            entry = entries[key] = [f"{{{{{kind}_{token}}}}}", None]
+            while len(entries) > self.maxsize:
+                entries.popitem(last=False)
+            return entry
+
+    def tag(self, kind: str, value: str) -> str:
+        return self._entry(kind, value)[0]
+
+    def redacted(self, kind: str, value: str) -> Tuple[str, str]:
+        """(tag, "tag(masque)") pour le mode redact; le masque n'est calculé qu'une fois."""
+        entry = self._entry(kind, value)
+        if entry[1] is None:
+            entry[1] = f"{entry[0]}({_mask_value(kind, value)})"
+        return entry[0], entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "size": len(self._entries), "maxsize": self.maxsize}
+
+# Caches partagés entre appels, indexés par l'empreinte SHA-256 du secret (jamais le secret lui-même)
+_TAG_CACHES: OrderedDict[bytes, TagCache] = OrderedDict()
+_MAX_TAG_CACHES = 16
+_TAG_CACHES_LOCK = threading.Lock()
+
+def get_tag_cache(secret: bytes, maxsize: int | None = None) -> TagCache:
+    """
+    Retourne le TagCache du processus pour `secret` (créé au besoin), réutilisé d'un appel
+    à anonymize() à l'autre. `maxsize` redimensionne le cache.
+    """
+    fp = hashlib.sha256(secret).digest()
+    with _TAG_CACHES_LOCK:
+        cache = _TAG_CACHES.get(fp)
+        if cache is None:
+            cache = _TAG_CACHES[fp] = TagCache(secret)
+            while len(_TAG_CACHES) > _MAX_TAG_CACHES:
+                _TAG_CACHES.popitem(last=False)
+        else:
+            _TAG_CACHES.move_to_end(fp)
+    if maxsize is not None:
+        cache.maxsize = maxsize
+    return cache
+
+def _replacement(tags: TagCache, kind: str, val: str, mode: str, mapping: Dict[str, str]) -> str:
+    if mode == "redact":
+        # Masquage partiel lisible, mis en cache avec le tag
+        tag, out = tags.redacted(kind, val)
+    else:
+        tag = out = tags.tag(kind, val)
+    mapping[tag] = val
+    return out
+
+def _check_secret(secret: bytes) -> None:
+    if not isinstance(secret, (bytes, bytearray)) or len(secret) < 16:
+        raise ValueError("secret doit être en bytes et faire au moins 16 octets (32+ recommandé).")
+
 @dataclass
 class AnonResult:
     text: str
     mapping: Dict[str, str] = field(default_factory=dict)
 
+class ResultCache:
+    """
+    Cache des résultats d'anonymize(), adressé par contenu: la clé est un SHA-256 de
+    (empreinte du secret, registre des détecteurs, include/exclude, mode, texte).
+    - mémoire: LRU borné à `max_bytes` (taille estimée du texte + mapping);
+    - disque (optionnel, `path`): un fichier JSON par clé, les moins récemment lus
+      supprimés au-delà de `disk_max_bytes`.
+    L'empreinte du secret est un HMAC (le secret n'est pas retrouvable depuis les clés),
+    et un résultat n'est jamais servi pour un autre secret.
+    ⚠ Comme le mapping, le tier disque contient les valeurs originales: à stocker en lieu sûr.
+    """
+
+    def __init__(self, max_bytes: int = 64 << 20, path: str | None = None,
+                 disk_max_bytes: int = 1 << 30):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: OrderedDict[str, Tuple[AnonResult, int]] = OrderedDict()
+        self._fingerprints: Dict[bytes, str] = {}
+        self.mem_bytes = 0
+        self.disk_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self.disk_bytes = sum(e.stat().st_size for e in os.scandir(path) if e.name.endswith(".json"))
+
+    def _fingerprint(self, secret: bytes) -> str:
+        fp = self._fingerprints.get(secret)
+        if fp is None:
+            fp = hmac.new(secret, b"prompt_privacy:result-cache", hashlib.sha256).hexdigest()
+            self._fingerprints[bytes(secret)] = fp
+        return fp
+
+    def key(self, text: str, secret: bytes, kinds: Iterable[str], mode: str = "placeholder") -> str:
+        """Clé du résultat; `kinds` = types actifs (voir _select_kinds)."""
+        h = hashlib.sha256()
+        h.update("\0".join((self._fingerprint(secret), _registry_fingerprint(),
+                            ",".join(kinds), mode, "")).encode("utf-8"))
+        h.update(text.encode("utf-8", "surrogatepass"))
+        return h.hexdigest()
+
+    @staticmethod
+    def _size(result: AnonResult) -> int:
+        return len(result.text) + sum(len(t) + len(v) for t, v in result.mapping.items())
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key + ".json")
+
+    def get(self, key: str, size: int = 0) -> AnonResult | None:
+        """Résultat en cache (copie) ou None. `size` = taille du texte, pour bytes_saved."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            result = entry[0]
+        else:
+            result = self._disk_get(key) if self.path else None
+            if result is None:
+                self.misses += 1
+                return None
+            self._remember(key, result)
+        self.hits += 1
+        self.bytes_saved += size
+        return AnonResult(result.text, dict(result.mapping))
+
+    def put(self, key: str, result: AnonResult) -> None:
+        result = AnonResult(result.text, dict(result.mapping))
+        self._remember(key, result)
+        if self.path:
+            self._disk_put(key, result)
+
+    def _remember(self, key: str, result: AnonResult) -> None:
+        size = self._size(result)
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.mem_bytes -= old[1]
+        self._entries[key] = (result, size)
+        self.mem_bytes += size
+        while self.mem_bytes > self.max_bytes:
+            _, (_, dropped) = self._entries.popitem(last=False)
+            self.mem_bytes -= dropped
+
+    def _disk_get(self, key: str) -> AnonResult | None:
+        fname = self._file(key)
+        try:
+            with open(fname, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            os.utime(fname)  # LRU disque: mtime = dernière lecture
+        except (OSError, ValueError):
+            return None
+        return AnonResult(data["text"], data["mapping"])
+
+    def _disk_put(self, key: str, result: AnonResult) -> None:
+        fname = self._file(key)
+        if os.path.exists(fname):
+            return
+        data = json.dumps({"text": result.text, "mapping": result.mapping}, ensure_ascii=False)
+        tmp = fname + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, fname)
+        self.disk_bytes += os.path.getsize(fname)
+        if self.disk_bytes > self.disk_max_bytes:
+            self._disk_evict()
+
+    def _disk_evict(self) -> None:
+        files = sorted((e.stat().st_mtime, e.stat().st_size, e.path)
+                       for e in os.scandir(self.path) if e.name.endswith(".json"))
+        total = sum(size for _, size, _ in files)
+        for _, size, fname in files:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(fname)
+                total -= size
+            except OSError:
+                pass
+        self.disk_bytes = total
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.mem_bytes = 0
+        self.hits = self.misses = self.bytes_saved = 0
+        if self.path:
+            for e in os.scandir(self.path):
+                if e.name.endswith(".json"):
+                    os.remove(e.path)
+            self.disk_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "bytes_saved": self.bytes_saved, "size": len(self._entries),
+                "mem_bytes": self.mem_bytes, "disk_bytes": self.disk_bytes}
+
 def anonymize(text: str, secret: bytes, include: Iterable[str] | None = None,
               exclude: Iterable[str] | None = None,
-              mode: str = "placeholder") -> AnonResult:
+              mode: str = "placeholder",
+              tag_cache: TagCache | None = None,
+              result_cache: ResultCache | None = None) -> AnonResult:
     """
     Remplace les occurrences trouvées par des tags stables {{TYPE_token}}.
     - secret: bytes pour HMAC (32+ octets recommandé).
     - include/exclude: limiter/retirer certains types.
     - mode: "placeholder" (par défaut) ou "redact" (masquage partiel).
+    - tag_cache: cache de tags à utiliser (défaut: get_tag_cache(secret)).
+    - result_cache: ResultCache optionnel (prompts/templates répétés à l'identique).
+
+    Si deux matches se chevauchent, le type de plus petite priorité l'emporte (voir _spans).
 
     Retour: AnonResult(text, mapping) — mapping[tag] = valeur originale
     """
-    if not isinstance(secret, (bytes, bytearray)) or len(secret) < 16:
-        raise ValueError("secret doit être en bytes et faire au moins 16 octets (32+ recommandé).")
+    _check_secret(secret)
+    tags = tag_cache or get_tag_cache(secret)
+    kinds = _select_kinds(include, exclude)
+    if result_cache is None:
+        return _anonymize_kinds(text, tags, kinds, mode)
+    key = result_cache.key(text, secret, kinds, mode)
+    result = result_cache.get(key, len(text))
+    if result is None:
+        result = _anonymize_kinds(text, tags, kinds, mode)
+        result_cache.put(key, result)
+    return result
 
+def _anonymize_kinds(text: str, tags: TagCache, kinds: List[str], mode: str) -> AnonResult:
     text = _normalize(text)
     mapping: Dict[str, str] = {}
+    spans = _spans(text, _patterns(_prefiltered(kinds, text)))
 
-    kinds = list(PATTERNS.keys())
-    if include:
-        include_set = set(include)
-        kinds = [k for k in kinds if k in include_set]
-    if exclude:
-        exclude_set = set(exclude)
-        kinds = [k for k in kinds if k not in exclude_set]
+    # La sortie est assemblée en un seul join
+    parts: List[str] = []
+    pos = 0
+    for s, e, kind in spans:
+        if kind == _TAG_GROUP:
+            continue
+        parts.append(text[pos:s])
+        parts.append(_replacement(tags, kind, text[s:e], mode, mapping))
+        pos = e
+    parts.append(text[pos:])
 
-    # On applique les patterns un par un (du plus spécifique au plus générique si nécessaire)
-    for kind in kinds:
-        rx = PATTERNS[kind]
-
-        def repl(m: re.Match) -> str:
-            val = m.group(0)
-            # Évite de retagger un tag déjà présent
-            if val.startswith("{{") and val.endswith("}}"):
-                return val
-            tag = _stable_tag(secret, kind, val)
-            if mode == "redact":
-                # Masquage partiel lisible
-                masked = _mask_value(kind, val)
-                mapping[tag] = val
-                return f"{tag}({masked})"
-            else:
-                mapping[tag] = val
-                return tag
+    return AnonResult(text="".join(parts), mapping=mapping)
 
-        text = rx.sub(repl, text)
+# Un fichier contenant l'un de ces octets passe par le chemin str (normalisation nécessaire:
+# \r, non-ASCII pour NFC, \x1c-\x1f que \s inclut en str mais pas en bytes)
+_NEEDS_TEXT_RX = re.compile(rb"[\r\x1c-\x1f\x80-\xff]")
+_WRITE_BLOCK = 1 << 20
+
+def anonymize_file(path: str, writer: BinaryIO, secret: bytes,
+                   include: Iterable[str] | None = None,
+                   exclude: Iterable[str] | None = None,
+                   mode: str = "placeholder",
+                   mapping: Dict[str, str] | None = None,
+                   tag_cache: TagCache | None = None) -> Dict[str, str]:
+    """
+    Anonymise un fichier via mmap et des regex bytes, sans copie str du texte, et écrit
+    le résultat (UTF-8) dans `writer` (binaire), par blocs joints en une fois.
+    Un fichier ASCII sans \r est déjà normalisé (NFC inutile), ce qui est vérifié en un
+    seul scan; sinon (ou pattern non convertible en bytes) on repasse par anonymize().
 
-    return AnonResult(text=text, mapping=mapping)
+    Retour: le mapping (mapping[tag] = valeur originale)
+    """
+    _check_secret(secret)
+    tags = tag_cache or get_tag_cache(secret)
+    if mapping is None:
+        mapping = {}
+    import mmap
+    kinds = _select_kinds(include, exclude)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return mapping
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            patterns = None
+            if not _NEEDS_TEXT_RX.search(mm):
+                patterns = _compile_bytes_patterns(_sources(_prefiltered_bytes(kinds, mm)))
+            if patterns is None:
+                result = anonymize(mm[:].decode("utf-8"), secret, include=include, exclude=exclude,
+                                   mode=mode, tag_cache=tags)
+                mapping.update(result.mapping)
+                writer.write(result.text.encode("utf-8"))
+                return mapping
+
+            spans = _spans(mm, patterns)
+            # Sortie par blocs d'au plus ~_WRITE_BLOCK octets, dans un bytearray: pas d'objet
+            # par morceau de texte, et la fin du fichier (sans match) est écrite sans copie
+            view = memoryview(mm)
+            block = bytearray()
+            pos = 0
+            try:
+                for start, end, kind in spans:
+                    if kind == _TAG_GROUP:
+                        continue
+                    block += view[pos:start]
+                    block += _replacement(tags, kind, mm[start:end].decode("ascii"), mode, mapping).encode("utf-8")
+                    pos = end
+                    if len(block) >= _WRITE_BLOCK:
+                        writer.write(block)
+                        block = bytearray()
+                writer.write(block)
+                tail = view[pos:]
+                writer.write(tail)
+                tail.release()
+            finally:
+                view.release()
+    return mapping
+
+def profile_detectors(text: str, include: Iterable[str] | None = None,
+                      exclude: Iterable[str] | None = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Diagnostic: évalue chaque détecteur SEUL sur `text` pour voir lesquels dominent le coût
+    (dans le moteur normal, un détecteur ne cherche que dans les zones laissées libres).
+    Retour: kind -> {"prefilter_s", "regex_s", "matches", "skipped"}
+    """
+    text = _normalize(text)
+    low = text.lower()
+    report: Dict[str, Dict[str, Any]] = {}
+    for kind in _select_kinds(include, exclude):
+        det = DETECTORS[kind]
+        t0 = time.perf_counter()
+        skipped = bool(det.prefilter) and not any(lit in low for lit in det.prefilter)
+        t1 = time.perf_counter()
+        matches = 0 if skipped else sum(1 for _ in det.pattern.finditer(text))
+        t2 = time.perf_counter()
+        report[kind] = {"prefilter_s": t1 - t0, "regex_s": t2 - t1,
+                        "matches": matches, "skipped": skipped}
+    return report
+
+# Streaming: taille des lectures, fenêtre de recouvrement entre chunks, et contexte
+# conservé avant le point de coupe (pour que \b voie le caractère précédent).
+STREAM_CHUNK_SIZE = 1 << 20
+STREAM_OVERLAP = 4096
+_STREAM_LOOKBEHIND = 16
+
+def anonymize_stream(reader: TextIO, writer: TextIO, secret: bytes,
+                     include: Iterable[str] | None = None,
+                     exclude: Iterable[str] | None = None,
+                     mode: str = "placeholder",
+                     mapping: Dict[str, str] | None = None,
+                     chunk_size: int = STREAM_CHUNK_SIZE,
+                     overlap: int = STREAM_OVERLAP,
+                     tag_cache: TagCache | None = None) -> Dict[str, str]:
+    """
+    Comme anonymize(), mais lit `reader` par chunks de `chunk_size` caractères et écrit
+    le résultat au fil de l'eau dans `writer`: la mémoire reste bornée quelle que soit la taille.
+    - overlap: les `overlap` derniers caractères d'un chunk sont retraités avec le suivant,
+      pour ne pas rater un match à cheval sur deux chunks (un match plus long que la fenêtre
+      peut être coupé).
+    - mapping: dict mis à jour au fur et à mesure (créé si None).
+
+    Retour: le mapping (mapping[tag] = valeur originale)
+    """
+    _check_secret(secret)
+    if not 0 < overlap < chunk_size:
+        raise ValueError("overlap doit être > 0 et < chunk_size.")
+    tags = tag_cache or get_tag_cache(secret)
+    if mapping is None:
+        mapping = {}
+    kinds = _select_kinds(include, exclude)
+
+    buf = ""
+    start = 0       # buf[:start] = contexte déjà écrit
+    held_cr = ""    # "\r" final gardé pour le chunk suivant (paire \r\n coupée)
+    while True:
+        chunk = held_cr + reader.read(chunk_size)
+        eof = chunk == held_cr
+        held_cr = ""
+        if not eof and chunk.endswith("\r"):
+            chunk, held_cr = chunk[:-1], "\r"
+        buf = _normalize(buf + chunk)
+        # Un match est entièrement dans buf: le préfiltre s'applique au buffer courant
+        # Les matches qui touchent la fin du buffer pourraient continuer dans le chunk suivant:
+        # ils sont écartés, et rien n'est écrit à partir du premier (held)
+        spans, held = _resolve(buf, _patterns(_prefiltered(kinds, buf[start:])), start, not eof)
+
+        end = len(buf)
+        limit = end if eof else min(end - overlap, held)
+        parts: List[str] = []
+        pos = start
+        cut = None
+        for s, e, kind in spans:
+            if s >= limit:
+                break
+            if e > limit:
+                # Un match plus prioritaire qui le chevauche pourrait n'être complet qu'au
+                # chunk suivant: il est retraité avec la suite
+                cut = s
+                break
+            if kind == _TAG_GROUP:
+                # Tag existant recopié tel quel; pos avance pour que la coupe ne tombe pas dedans
+                parts.append(buf[pos:e])
+            else:
+                parts.append(buf[pos:s])
+                parts.append(_replacement(tags, kind, buf[s:e], mode, mapping))
+            pos = e
+        if cut is None:
+            cut = max(pos, limit)
+        parts.append(buf[pos:cut])
+        writer.write("".join(parts))
+
+        if eof:
+            return mapping
+        keep = max(0, cut - _STREAM_LOOKBEHIND)
+        buf = buf[keep:]
+        start = cut - keep
 
 def _mask_value(kind: str, val: str) -> str:
-    v = val.strip()
-    if kind in ("EMAIL",):
-        # aaa@***.com
-        try:
-            name, dom = v.split("@", 1)
-            return (name[:1] + "***@" + _mask_mid(dom))
-        except ValueError:
-            return _mask_mid(v)
-    if kind in ("PHONE", "IBAN", "AHV"):
-        return _keep_last(v, 4, fill="•")
-    if kind in ("CLIENT_ID", "INVOICE"):
-        return _keep_last(v, 3, fill="•")
-    if kind in ("PERSON_NAME", "ADDRESS_HINT"):
-        return v[0] + "…" if v else v
-    if kind in ("URL",):
-        return v.split("/", 3)[2] if v.startswith("http") else _mask_mid(v)
-    return _mask_mid(v)
+    return MASKERS.get(kind, _mask_mid)(val.strip())
+
+def mask_values(kind: str, values: Iterable[str]) -> List[str]:
+    """
+    Masque toute une colonne de valeurs d'un même type (mode redact sans tag):
+    la fonction de masque est résolue une fois, chaque valeur distincte masquée une fois.
+    """
+    masker = MASKERS.get(kind, _mask_mid)
+    values = list(values)
+    masks = {v: masker(v.strip()) for v in dict.fromkeys(values)}
+    return [masks[v] for v in values]
+
+def _mask_email(v: str) -> str:
+    # aaa@***.com
+    name, at, dom = v.partition("@")
+    return name[:1] + "***@" + _mask_mid(dom) if at else _mask_mid(v)
 
 def _keep_last(s: str, n: int, fill: str = "•") -> str:
-    s2 = re.sub(r"\s+", "", s)
+    s2 = "".join(s.split())
     if len(s2) <= n:
         return s2
     return fill * (len(s2) - n) + s2[-n:]
 
+def _keep_last4(v: str) -> str:
+    return _keep_last(v, 4)
+
+def _keep_last3(v: str) -> str:
+    return _keep_last(v, 3)
+
+def _mask_initial(v: str) -> str:
+    return v[0] + "…" if v else v
+
+def _mask_url(v: str) -> str:
+    return v.split("/", 3)[2] if v.startswith("http") else _mask_mid(v)
+
 def _mask_mid(s: str) -> str:
     if len(s) <= 4:
         return "•" * len(s)
@@ -178,6 +933,163 @@ def _mask_mid(s: str) -> str:
     right = len(s) // 3
     return s[:left] + "•" * (len(s) - left - right) + s[-right:]
 
+# Masque (mode redact) par type, appliqué à la valeur sans espaces de bord; défaut: _mask_mid.
+# register_detector(..., mask=f) ajoute/remplace une entrée.
+MASKERS: Dict[str, Callable[[str], str]] = {
+    "EMAIL": _mask_email,
+    "PHONE": _keep_last4, "IBAN": _keep_last4, "AHV": _keep_last4,
+    "CLIENT_ID": _keep_last3, "INVOICE": _keep_last3,
+    "PERSON_NAME": _mask_initial, "ADDRESS_HINT": _mask_initial,
+    "URL": _mask_url,
+}
+
+
+# ------------------------ Batch (multi-processus) -----------------------
+
+BATCH_SIZE = 256
+
+def _anonymize_item(item: Any, opts: Dict[str, Any], mapping: Dict[str, str]) -> Any:
+    # Une chaîne, ou un dict (record JSONL, ligne CSV) dont on anonymise les champs demandés
+    secret, include, exclude, mode = opts["secret"], opts["include"], opts["exclude"], opts["mode"]
+    if isinstance(item, str):
+        result = anonymize(item, secret, include=include, exclude=exclude, mode=mode)
+        mapping.update(result.mapping)
+        return result.text
+    out = dict(item)
+    fields = opts["fields"]
+    if fields is None:
+        fields = {key: None for key in out}
+    elif not isinstance(fields, dict):
+        fields = {key: None for key in fields}
+    for key, kinds in fields.items():
+        if isinstance(out.get(key), str):
+            result = anonymize(out[key], secret, include=kinds or include, exclude=exclude, mode=mode)
+            mapping.update(result.mapping)
+            out[key] = result.text
+    # Colonnes typées: la valeur entière est une donnée du type indiqué (pas de regex)
+    if opts["whole"]:
+        tags = get_tag_cache(secret)
+        for key, kind in opts["whole"].items():
+            val = out.get(key)
+            if isinstance(val, str) and val.strip():
+                out[key] = _replacement(tags, kind, _normalize(val), mode, mapping)
+    return out
+
+# Options d'un processus worker (initialisées une fois par processus, pas par lot)
+_WORKER: Dict[str, Any] = {}
+
+def _init_worker(opts: Dict[str, Any]) -> None:
+    _WORKER.update(opts)
+
+def _anonymize_batch(batch: List[Any]) -> Tuple[List[Any], Dict[str, str]]:
+    # Retourne les items anonymisés + le mapping partiel du lot
+    mapping: Dict[str, str] = {}
+    out = [_anonymize_item(item, _WORKER, mapping) for item in batch]
+    return out, mapping
+
+def _batches(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch: List[Any] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def anonymize_many(items: Iterable[Any], secret: bytes,
+                   include: Iterable[str] | None = None,
+                   exclude: Iterable[str] | None = None,
+                   mode: str = "placeholder",
+                   mapping: Dict[str, str] | None = None,
+                   fields: Iterable[str] | Dict[str, List[str]] | None = None,
+                   whole: Dict[str, str] | None = None,
+                   workers: int | None = None,
+                   batch_size: int = BATCH_SIZE) -> Iterator[Any]:
+    """
+    Anonymise un grand nombre de textes en les répartissant sur un pool de processus.
+    - items: chaînes, ou dicts (records JSONL, lignes CSV) dont les champs `fields` sont
+      anonymisés (tous les champs texte si fields=None). `fields` peut aussi être un dict
+      champ -> types: seuls ces détecteurs sont appliqués à ce champ.
+    - whole: champ -> type; la valeur entière du champ est taguée comme ce type.
+    - mapping: dict complété avec les mappings partiels renvoyés par les workers
+      (complet une fois l'itérateur épuisé) — à passer ensuite à save_mapping().
+    - workers: nombre de processus (défaut: os.cpu_count()); 1 = pas de pool.
+
+    Les résultats sont produits dans l'ordre d'entrée. Le nombre de lots en vol est borné,
+    donc `items` peut être un itérateur sur des millions de records.
+    """
+    _check_secret(secret)
+    if mapping is None:
+        mapping = {}
+    if fields is not None and not isinstance(fields, dict):
+        fields = list(fields)
+    opts = {"secret": secret, "include": list(include) if include else None,
+            "exclude": list(exclude) if exclude else None, "mode": mode,
+            "fields": fields, "whole": dict(whole) if whole else None}
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        for item in items:
+            yield _anonymize_item(item, opts, mapping)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(opts,)) as pool:
+        pending: deque = deque()
+        for batch in _batches(items, batch_size):
+            pending.append(pool.submit(_anonymize_batch, batch))
+            if len(pending) >= workers * 4:
+                out, partial = pending.popleft().result()
+                mapping.update(partial)
+                yield from out
+        while pending:
+            out, partial = pending.popleft().result()
+            mapping.update(partial)
+            yield from out
+
+
+def anonymize_csv(reader: TextIO, writer: TextIO, secret: bytes,
+                  columns: Dict[str, List[str]] | None = None,
+                  whole: Dict[str, str] | None = None,
+                  mode: str = "placeholder",
+                  mapping: Dict[str, str] | None = None,
+                  workers: int | None = 1,
+                  batch_size: int = BATCH_SIZE) -> Dict[str, str]:
+    """
+    Anonymise un CSV ligne par ligne (lecture et écriture en flux, via le module csv).
+    - columns: colonne -> types, seuls ces détecteurs sont appliqués à la colonne
+      (ex: {"Email": ["EMAIL"], "Phone 1": ["PHONE"]}); les autres colonnes sont recopiées.
+    - whole: colonne -> type, la cellule entière est taguée (ex: {"First Name": "PERSON_NAME"}).
+    - workers/batch_size: lots de lignes répartis comme dans anonymize_many().
+
+    Retour: le mapping (complété au fil des lignes)
+    """
+    import csv
+    if mapping is None:
+        mapping = {}
+    rows = csv.DictReader(reader)
+    out = csv.DictWriter(writer, fieldnames=rows.fieldnames or [])
+    out.writeheader()
+    for row in anonymize_many(rows, secret, mode=mode, mapping=mapping, fields=columns or {},
+                              whole=whole, workers=workers, batch_size=batch_size):
+        out.writerow(row)
+    return mapping
+
+def _parse_columns(spec: str | None) -> Dict[str, List[str]]:
+    # "Email=EMAIL,Notes=EMAIL|PHONE" -> {"Email": ["EMAIL"], "Notes": ["EMAIL", "PHONE"]}
+    columns: Dict[str, List[str]] = {}
+    for part in (spec.split(",") if spec else []):
+        col, sep, kinds = part.partition("=")
+        if not sep or not kinds:
+            raise SystemExit(f"Colonne invalide: {part!r} (attendu: Colonne=TYPE[|TYPE...]).")
+        unknown = [k for k in kinds.split("|") if k not in DETECTORS]
+        if unknown:
+            raise SystemExit(f"Type(s) inconnu(s) pour {col!r}: {', '.join(unknown)}")
+        columns[col] = kinds.split("|")
+    return columns
+
 
 # ---------------------- Mapping persistence (HMAC) ----------------------
 
@@ -190,8 +1102,15 @@ def save_mapping(path: str, mapping: Dict[str, str], secret: bytes) -> None:
     raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
     mac = hmac.new(secret, raw, hashlib.sha256).hexdigest()
     data = {"mapping": mapping, "mac": mac}
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    tmp = path + ".tmp"  # remplacement atomique: un arrêt pendant l'écriture garde l'ancien fichier
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
 
 def load_mapping(path: str, secret: bytes) -> Dict[str, str]:
     with open(path, "r", encoding="utf-8") as f:
@@ -207,6 +1126,20 @@ def load_mapping(path: str, secret: bytes) -> Dict[str, str]:
 
 # ------------------------------- CLI -----------------------------------
 
+# --mapping en .db/.sqlite -> MappingStore (ajout incrémental) au lieu du JSON réécrit en entier
+_STORE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+def _open_store(path: str, secret: bytes):
+    from prompt_privacy_store import MappingStore
+    return MappingStore(path, secret)
+
+def _write_mapping(path: str, mapping: Dict[str, str], secret: bytes) -> None:
+    if path.endswith(_STORE_SUFFIXES):
+        with _open_store(path, secret) as store:
+            store.update(mapping)
+    else:
+        save_mapping(path, mapping, secret)
+
 def _read_secret(secret: str | None, secret_file: str | None) -> bytes:
     if secret and secret_file:
         raise SystemExit("--secret et --secret-file sont exclusifs.")
@@ -234,36 +1167,273 @@ def _looks_b64_bytes(b: bytes) -> bool:
 
 def cmd_genkey(args):
     # Clé 32 bytes aléatoire, exportée en base64
+    import secrets
     key = secrets.token_bytes(32)
     print(base64.b64encode(key).decode("ascii"))
 
 def cmd_anon(args):
     secret = _read_secret(args.secret, args.secret_file)
-    text = sys.stdin.read() if args.infile == "-" else open(args.infile, "r", encoding="utf-8").read()
     include = args.include.split(",") if args.include else None
     exclude = args.exclude.split(",") if args.exclude else None
-    result = anonymize(text, secret, include=include, exclude=exclude, mode=args.mode)
+    if len(args.infile) > 1 and not args.out_dir:
+        raise SystemExit("plusieurs --in: --out-dir requis.")
+    if args.out_dir and "-" in args.infile:
+        raise SystemExit("--out-dir nécessite des fichiers (pas stdin).")
+    if args.mmap and "-" in args.infile:
+        raise SystemExit("--mmap nécessite un fichier (pas stdin).")
+    # Un seul processus pour tous les fichiers: matcher, cache de tags et mapping partagés
+    mapping: Dict[str, str] = {}
+    for infile in args.infile:
+        if args.out_dir:
+            out_path = os.path.join(args.out_dir, os.path.basename(infile))
+            with open(out_path, "wb") as out:
+                _anon_one(args, infile, out, secret, include, exclude, mapping)
+        else:
+            _anon_one(args, infile, sys.stdout.buffer, secret, include, exclude, mapping)
     if args.mapping:
-        save_mapping(args.mapping, result.mapping, secret)
-    print(result.text)
+        _write_mapping(args.mapping, mapping, secret)
+
+def _anon_one(args, infile: str, out: BinaryIO, secret: bytes, include, exclude,
+              mapping: Dict[str, str]) -> None:
+    # Anonymise un fichier (ou stdin) vers `out` (binaire, UTF-8), mapping complété sur place
+    if args.mmap:
+        anonymize_file(infile, out, secret, include=include, exclude=exclude, mode=args.mode,
+                       mapping=mapping)
+        out.flush()
+        return
+    if out is sys.stdout.buffer:
+        writer = sys.stdout
+    else:
+        writer = io.TextIOWrapper(out, encoding="utf-8", newline="")
+    reader = sys.stdin if infile == "-" else open(infile, "r", encoding="utf-8")
+    try:
+        if args.stream:
+            anonymize_stream(reader, writer, secret, include=include, exclude=exclude,
+                             mode=args.mode, mapping=mapping)
+        else:
+            result = anonymize(reader.read(), secret, include=include, exclude=exclude, mode=args.mode)
+            mapping.update(result.mapping)
+            writer.write(result.text + "\n")
+        writer.flush()
+    finally:
+        if reader is not sys.stdin:
+            reader.close()
+        if writer is not sys.stdout:
+            writer.detach()
+
+def cmd_anon_batch(args):
+    secret = _read_secret(args.secret, args.secret_file)
+    include = args.include.split(",") if args.include else None
+    exclude = args.exclude.split(",") if args.exclude else None
+    fields = args.fields.split(",") if args.fields else None
+    reader = sys.stdin if args.infile == "-" else open(args.infile, "r", encoding="utf-8")
+    writer = sys.stdout if args.outfile == "-" else open(args.outfile, "w", encoding="utf-8")
+    mapping: Dict[str, str] = {}
+    try:
+        records = (json.loads(line) for line in reader if line.strip())
+        for rec in anonymize_many(records, secret, include=include, exclude=exclude, mode=args.mode,
+                                  mapping=mapping, fields=fields, workers=args.workers,
+                                  batch_size=args.batch_size):
+            writer.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    finally:
+        if reader is not sys.stdin:
+            reader.close()
+        if writer is not sys.stdout:
+            writer.close()
+    if args.mapping:
+        _write_mapping(args.mapping, mapping, secret)
+
+def cmd_anon_csv(args):
+    secret = _read_secret(args.secret, args.secret_file)
+    columns = _parse_columns(args.columns)
+    whole = {}
+    for col, kinds in _parse_columns(args.typed).items():
+        # La cellule entière devient UN tag: un seul type possible par colonne
+        if len(kinds) > 1:
+            raise SystemExit(f"--typed: un seul type par colonne ({col}={'|'.join(kinds)}).")
+        whole[col] = kinds[0]
+    if not columns and not whole:
+        raise SystemExit("anon-csv: indiquez --columns et/ou --typed.")
+    reader = sys.stdin if args.infile == "-" else open(args.infile, "r", encoding="utf-8", newline="")
+    writer = sys.stdout if args.outfile == "-" else open(args.outfile, "w", encoding="utf-8", newline="")
+    try:
+        mapping = anonymize_csv(reader, writer, secret, columns=columns, whole=whole, mode=args.mode,
+                                workers=args.workers, batch_size=args.batch_size)
+    finally:
+        if reader is not sys.stdin:
+            reader.close()
+        if writer is not sys.stdout:
+            writer.close()
+    if args.mapping:
+        _write_mapping(args.mapping, mapping, secret)
 
 def cmd_deanon(args):
     secret = _read_secret(args.secret, args.secret_file)
-    mapping = load_mapping(args.mapping, secret)
+    if args.mapping.endswith(_STORE_SUFFIXES):
+        with _open_store(args.mapping, secret) as store:
+            _deanon(args, store)
+    else:
+        _deanon(args, load_mapping(args.mapping, secret))
+
+def _deanon(args, mapping) -> None:
+    if args.stream:
+        reader = sys.stdin if args.infile == "-" else open(args.infile, "r", encoding="utf-8")
+        try:
+            deanonymize_stream(reader, sys.stdout, mapping)
+        finally:
+            if reader is not sys.stdin:
+                reader.close()
+        return
     text = sys.stdin.read() if args.infile == "-" else open(args.infile, "r", encoding="utf-8").read()
     out = deanonymize(text, mapping)
     print(out)
 
+def cmd_serve(args):
+    from prompt_privacy_server import PrivacyServer, run
+    secret = _read_secret(args.secret, args.secret_file)
+    mapping = None
+    if args.mapping and args.mapping.endswith(_STORE_SUFFIXES):
+        mapping = _open_store(args.mapping, secret)
+    elif args.mapping and os.path.exists(args.mapping):
+        mapping = load_mapping(args.mapping, secret)
+    result_cache = None
+    if args.result_cache_mb or args.result_cache_dir:
+        result_cache = ResultCache(max_bytes=int((args.result_cache_mb or 64) * (1 << 20)),
+                                   path=args.result_cache_dir)
+    server = PrivacyServer(secret, mapping=mapping, mapping_path=args.mapping, mode=args.mode,
+                           result_cache=result_cache, flush_interval=args.flush_interval)
+    run(server, host=args.host, port=args.port, unix_path=args.unix)
+
+def cmd_bench(args):
+    import prompt_privacy_bench as bench
+    if args.startup:
+        over = {}
+        for name, ms in bench.cold_start().items():
+            print(f"démarrage {name:<24} {ms:7.1f} ms (budget {args.startup_budget_ms:.0f} ms)")
+            if ms > args.startup_budget_ms:
+                over[name] = ms
+        if over:
+            raise SystemExit(f"Budget de démarrage dépassé: {', '.join(over)}")
+        return
+    sizes = [int(float(x) * 1e6) for x in args.sizes.split(",")]
+    densities = [float(x) for x in args.densities.split(",")]
+
+    def suite():
+        return bench.run_suite(sizes, densities, args.repeat)
+
+    results = suite()
+    if args.profile:
+        # Passe séparée: le profilage fausse les temps, qui sont mesurés sans lui
+        print(bench.profiled(suite, args.profile, args.profile_out)[1])
+    bench.print_suite(results)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = bench.compare_to_baseline(results, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"RÉGRESSION {r}", file=sys.stderr)
+        if regressions:
+            raise SystemExit(1)
+        print(f"Aucune régression (> {args.tolerance:.0%}) par rapport à {args.baseline}.")
+
+def cmd_store(args):
+    secret = _read_secret(args.secret, args.secret_file)
+    with _open_store(args.store, secret) as store:
+        if args.action == "import":
+            if not args.json:
+                raise SystemExit("store import: --json requis.")
+            print(f"{store.import_json(args.json, secret)} entrées importées ({len(store)} au total).")
+        elif args.action == "verify":
+            print(f"OK: {store.verify()} entrées, chaîne HMAC valide.")
+        elif args.action == "compact":
+            store.compact()
+            print(f"Compacté: {len(store)} entrées.")
+        elif args.action == "export":
+            if not args.json:
+                raise SystemExit("store export: --json requis.")
+            save_mapping(args.json, store.to_dict(), secret)
+            print(f"{len(store)} entrées exportées vers {args.json}.")
+
 
 def deanonymize(text: str, mapping: Dict[str, str]) -> str:
-    # Remplacement direct; en cas de collisions partielles, on remplace les tags plus longs d'abord
-    items = sorted(mapping.items(), key=lambda kv: -len(kv[0]))
-    for tag, val in items:
-        text = text.replace(tag, val)
-    return text
+    """
+    Restaure le texte original: tous les tags {{KIND_token}} sont trouvés en une seule passe
+    puis cherchés dans le mapping (coût indépendant de la taille du mapping).
+    Un tag absent du mapping est laissé tel quel. `mapping` peut être tout objet avec .get().
+    """
+    get = mapping.get
+    return _TAG_RX.sub(lambda m: get(m.group(0), m.group(0)), text)
+
+# Début de tag possiblement incomplet en fin de chunk ("{", "{{EMA", "{{EMAIL_abc}"...)
+_PARTIAL_TAG_RX = re.compile(r"\{(?:\{[A-Za-z0-9_-]*\}?)?\Z")
+_MAX_TAG_LEN = 64
+
+class Deanonymizer:
+    """
+    Désanonymisation incrémentale d'une sortie en flux (ex: tokens d'un LLM):
+
+        d = Deanonymizer(mapping)
+        for chunk in tokens:
+            send(d.feed(chunk))   # texte restauré, émis dès que possible
+        send(d.flush())
+
+    Seul un début de tag possiblement incomplet en fin de chunk est retenu
+    (au plus _MAX_TAG_LEN caractères); tout le reste est émis immédiatement.
+    """
+
+    def __init__(self, mapping: Dict[str, str]):
+        self.mapping = mapping
+        self._tail = ""
+
+    def feed(self, chunk: str) -> str:
+        buf = self._tail + chunk
+        m = _PARTIAL_TAG_RX.search(buf, max(0, len(buf) - _MAX_TAG_LEN))
+        cut = m.start() if m else len(buf)
+        self._tail = buf[cut:]
+        return deanonymize(buf[:cut], self.mapping)
+
+    def flush(self) -> str:
+        tail, self._tail = self._tail, ""
+        return deanonymize(tail, self.mapping)
+
+def deanonymize_iter(chunks: Iterable[str], mapping: Dict[str, str]) -> Iterator[str]:
+    """Générateur: restaure une suite de chunks (les chunks vides ne sont pas émis)."""
+    d = Deanonymizer(mapping)
+    for chunk in chunks:
+        out = d.feed(chunk)
+        if out:
+            yield out
+    tail = d.flush()
+    if tail:
+        yield tail
+
+async def adeanonymize(chunks: AsyncIterable[str], mapping: Dict[str, str]) -> AsyncIterator[str]:
+    """Variante async de deanonymize_iter(), pour les clients LLM en streaming async."""
+    d = Deanonymizer(mapping)
+    async for chunk in chunks:
+        out = d.feed(chunk)
+        if out:
+            yield out
+    tail = d.flush()
+    if tail:
+        yield tail
+
+def deanonymize_stream(reader: TextIO, writer: TextIO, mapping: Dict[str, str],
+                       chunk_size: int = STREAM_CHUNK_SIZE) -> None:
+    """Comme deanonymize(), en lisant `reader` par chunks (voir Deanonymizer)."""
+    d = Deanonymizer(mapping)
+    while True:
+        chunk = reader.read(chunk_size)
+        if not chunk:
+            writer.write(d.flush())
+            return
+        writer.write(d.feed(chunk))
 
 
 def _build_arg_parser() -> "argparse.ArgumentParser":
+    import argparse
     p = argparse.ArgumentParser(description="Anonymiseur de prompts réversible (regex + HMAC).")
     sub = p.add_subparsers(dest="cmd", required=True)
 
@@ -273,24 +1443,102 @@ def _build_arg_parser() -> "argparse.ArgumentParser":
 
     # anon
     a = sub.add_parser("anon", help="Anonymise un texte.")
-    a.add_argument("--in", dest="infile", required=True, help="Fichier d'entrée ou '-' pour stdin.")
-    a.add_argument("--mapping", help="Chemin du fichier mapping (JSON) à écrire.")
+    a.add_argument("--in", dest="infile", required=True, nargs="+",
+                   help="Fichier(s) d'entrée ou '-' pour stdin (plusieurs: --out-dir requis).")
+    a.add_argument("--out-dir", help="Dossier de sortie (un fichier par entrée, même nom) au lieu de stdout.")
+    a.add_argument("--mapping", help="Mapping à écrire (commun à tous les fichiers): JSON signé, ou sqlite (.db).")
     a.add_argument("--include", help="Types à inclure (liste séparée par des virgules).")
     a.add_argument("--exclude", help="Types à exclure (liste séparée par des virgules).")
     a.add_argument("--mode", choices=["placeholder","redact"], default="placeholder",
                    help="placeholder: tags {{TYPE_hash}}; redact: tags + masque court lisible.")
+    a.add_argument("--stream", action="store_true",
+                   help="Traite l'entrée par chunks (mémoire bornée, pour les très gros fichiers).")
+    a.add_argument("--mmap", action="store_true",
+                   help="Fichier mappé en mémoire + regex bytes (pas de copie str si ASCII).")
     a.add_argument("--secret", help="Clé secrète en clair ou en base64.")
     a.add_argument("--secret-file", help="Fichier contenant la clé secrète (binaire ou base64).")
     a.set_defaults(func=cmd_anon)
 
+    # anon-batch
+    b = sub.add_parser("anon-batch", help="Anonymise un corpus JSONL en parallèle (un record par ligne).")
+    b.add_argument("--in", dest="infile", required=True, help="Fichier JSONL d'entrée ou '-' pour stdin.")
+    b.add_argument("--out", dest="outfile", default="-", help="Fichier JSONL de sortie ou '-' pour stdout.")
+    b.add_argument("--fields", help="Champs à anonymiser (virgules). Défaut: tous les champs texte.")
+    b.add_argument("--mapping", help="Mapping à écrire: JSON signé, ou sqlite (.db) complété en ajout seul.")
+    b.add_argument("--include", help="Types à inclure (liste séparée par des virgules).")
+    b.add_argument("--exclude", help="Types à exclure (liste séparée par des virgules).")
+    b.add_argument("--mode", choices=["placeholder","redact"], default="placeholder")
+    b.add_argument("--workers", type=int, help="Nombre de processus (défaut: nombre de coeurs).")
+    b.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Records par lot envoyé à un worker.")
+    b.add_argument("--secret", help="Clé secrète en clair ou en base64.")
+    b.add_argument("--secret-file", help="Fichier contenant la clé secrète (binaire ou base64).")
+    b.set_defaults(func=cmd_anon_batch)
+
+    # anon-csv
+    c = sub.add_parser("anon-csv", help="Anonymise un CSV colonne par colonne (flux, lots de lignes).")
+    c.add_argument("--in", dest="infile", required=True, help="Fichier CSV d'entrée ou '-' pour stdin.")
+    c.add_argument("--out", dest="outfile", default="-", help="Fichier CSV de sortie ou '-' pour stdout.")
+    c.add_argument("--columns", help="Détecteurs par colonne: 'Email=EMAIL,Phone 1=PHONE,Notes=EMAIL|PHONE'.")
+    c.add_argument("--typed", help="Colonnes taguées en entier (un type par colonne): 'First Name=PERSON_NAME,Last Name=PERSON_NAME'.")
+    c.add_argument("--mapping", help="Mapping à écrire: JSON signé, ou sqlite (.db) complété en ajout seul.")
+    c.add_argument("--mode", choices=["placeholder","redact"], default="placeholder")
+    c.add_argument("--workers", type=int, default=1, help="Nombre de processus (défaut: 1).")
+    c.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Lignes par lot envoyé à un worker.")
+    c.add_argument("--secret", help="Clé secrète en clair ou en base64.")
+    c.add_argument("--secret-file", help="Fichier contenant la clé secrète (binaire ou base64).")
+    c.set_defaults(func=cmd_anon_csv)
+
     # deanon
     d = sub.add_parser("deanon", help="Désanonymise un texte avec un mapping existant.")
     d.add_argument("--in", dest="infile", required=True, help="Fichier d'entrée ou '-' pour stdin.")
-    d.add_argument("--mapping", required=True, help="Chemin du mapping JSON (avec MAC).")
+    d.add_argument("--mapping", required=True, help="Chemin du mapping JSON (avec MAC) ou sqlite (.db).")
     d.add_argument("--secret", help="Clé secrète en clair ou en base64.")
     d.add_argument("--secret-file", help="Fichier contenant la clé secrète.")
+    d.add_argument("--stream", action="store_true",
+                   help="Traite l'entrée par chunks (sortie de modèle en flux, gros fichiers).")
     d.set_defaults(func=cmd_deanon)
 
+    # serve
+    sv = sub.add_parser("serve", help="Serveur local (HTTP/asyncio): /anon, /deanon, /stats.")
+    sv.add_argument("--host", default="127.0.0.1")
+    sv.add_argument("--port", type=int, default=8765)
+    sv.add_argument("--unix", help="Écoute sur cette socket Unix au lieu de TCP.")
+    sv.add_argument("--mapping", help="Mapping JSON (rechargé, sauvé périodiquement et à l'arrêt) ou sqlite (.db).")
+    sv.add_argument("--flush-interval", type=float, default=5.0,
+                    help="Secondes entre deux sauvegardes d'un mapping JSON (0 = à l'arrêt seulement).")
+    sv.add_argument("--mode", choices=["placeholder","redact"], default="placeholder")
+    sv.add_argument("--result-cache-mb", type=float,
+                    help="Cache des résultats en mémoire (Mo) pour les prompts répétés.")
+    sv.add_argument("--result-cache-dir", help="Tier disque du cache des résultats (⚠ valeurs en clair).")
+    sv.add_argument("--secret", help="Clé secrète en clair ou en base64.")
+    sv.add_argument("--secret-file", help="Fichier contenant la clé secrète.")
+    sv.set_defaults(func=cmd_serve)
+
+    # bench
+    bn = sub.add_parser("bench", help="Mesures de performance (JSON), comparables à une référence.")
+    bn.add_argument("--sizes", default="0.1,1", help="Tailles des corpus en MB, séparées par des virgules.")
+    bn.add_argument("--densities", default="0.01,0.05,0.2", help="Densités de PII (part des mots).")
+    bn.add_argument("--repeat", type=int, default=3, help="Répétitions (meilleur temps retenu).")
+    bn.add_argument("--out", help="Fichier JSON des résultats.")
+    bn.add_argument("--baseline", help="Résultats JSON de référence; code 1 si régression.")
+    bn.add_argument("--tolerance", type=float, default=0.25, help="Ralentissement toléré (0.25 = +25%%).")
+    bn.add_argument("--profile", choices=["cprofile", "tracemalloc"], help="Profil CPU ou mémoire de la suite.")
+    bn.add_argument("--profile-out", help="Fichier pstats (avec --profile cprofile).")
+    bn.add_argument("--startup", action="store_true",
+                    help="Mesure le démarrage à froid du CLI (au-delà de python -c pass).")
+    bn.add_argument("--startup-budget-ms", type=float, default=100.0,
+                    help="Budget de démarrage; code 1 si dépassé.")
+    bn.set_defaults(func=cmd_bench)
+
+    # store
+    st = sub.add_parser("store", help="Gère un mapping persistant sqlite (import/verify/compact/export).")
+    st.add_argument("action", choices=["import", "verify", "compact", "export"])
+    st.add_argument("--store", required=True, help="Chemin du mapping sqlite (.db).")
+    st.add_argument("--json", help="Mapping JSON signé à importer / à exporter.")
+    st.add_argument("--secret", help="Clé secrète en clair ou en base64.")
+    st.add_argument("--secret-file", help="Fichier contenant la clé secrète.")
+    st.set_defaults(func=cmd_store)
+
     return p
 
 
@@ -0,0 +1,522 @@
+"""
+prompt_privacy_bench.py — Mesures de performance de prompt_privacy (stdlib uniquement).
+
+Compare le moteur actuel (un scan par type sur le texte original, chevauchements résolus par priorité) à l'ancien moteur
+(un rx.sub() par type) sur de gros prompts synthétiques, et affiche le débit en MB/s.
+Avec --batch N, mesure aussi anonymize_many() sur N prompts pour 1..cpu_count workers.
+Compare aussi deanonymize() à l'ancienne boucle text.replace() sur un gros mapping.
+Avec --adversarial, vérifie que PHONE et ADDRESS_HINT trouvent les mêmes matches que leurs
+anciennes versions (corpus + fuzzing) et que les détecteurs spécifiques (IBAN, AHV...)
+l'emportent sur les génériques (EXPECTED_TAGS), puis chronomètre des entrées pire-cas et échoue
+si une dépasse --ceiling secondes par MB.
+
+Usage:
+    python prompt_privacy_bench.py --size-mb 4 --repeat 3
+    python prompt_privacy_bench.py --size-mb 1 --batch 20000
+    python prompt_privacy_bench.py --adversarial --ceiling 1.0
+    python prompt_privacy_bench.py --size-mb 0.1 --csv-rows 1000000 --workers 4
+    python prompt_privacy_bench.py --size-mb 0.1 --file-mb 50
+
+Suite de mesures JSON (anonymize, deanonymize, save/load_mapping, coût par détecteur),
+comparable à une référence, appelée par la sous-commande `bench` de prompt_privacy.py:
+    python prompt_privacy.py bench --sizes 0.1,1 --densities 0.01,0.05,0.2 --out bench.json
+    python prompt_privacy.py bench --baseline bench.json --tolerance 0.25
+    python prompt_privacy.py bench --startup --startup-budget-ms 100
+"""
+
+from __future__ import annotations
+from typing import Any, Dict, Callable, List, Tuple
+import argparse
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from prompt_privacy import PATTERNS, DETECTORS, AnonResult, anonymize, anonymize_csv, anonymize_file, anonymize_many, deanonymize, get_tag_cache, load_mapping, profile_detectors, save_mapping, _normalize, _stable_tag, _mask_value
+
+
+BENCH_SECRET = b"bench-secret-0123456789abcdef0123"
+
+_FILLER = ("Bonjour, merci de traiter la demande suivante rapidement. Le dossier est "
+           "complet et les pièces sont jointes. ").split()
+_PII = [
+    "jean.dupont@example.com", "+41 79 123 45 67", "CH9300762011623852957",
+    "756.1234.5678.97", "https://intra.example.ch/dossier/42", "Marie Curie",
+    "CUST-004512", "INV-2025-000123", "2025-09-09", "rue du Lac 12",
+]
+
+
+# Versions d'origine (retour arrière imbriqué), référence pour la non-régression
+LEGACY_PATTERNS = {
+    "PHONE": re.compile(r"(?:\+?\s?4?1\s?[\s().-]?)?(?:0?\d[\s().-]?){8,}", re.IGNORECASE),
+    "ADDRESS_HINT": re.compile(r"\b(?:(?:rue|avenue|av\.?|route|rt\.?|chemin|ch\.?)\s+[A-Za-zÀ-ÖØ-öø-ÿ'’.-]+"
+                               r"(?:\s+\d{1,4}[A-Za-z]?)?)\b", re.IGNORECASE),
+}
+
+REGRESSION_CORPUS = [
+    "Appelez le +41 79 123 45 67 ou le 079 123 45 67.",
+    "Tel: +41 (0)21 345 67 89, fax 021.345.67.90, mobile 0041 79 555 12 34",
+    "Numéros: 0791234567;0217654321;+33 6 12 34 56 78",
+    "id,phone\n1,0791234567\n2,+41-79-123-45-67\n3,(021) 345 67 89",
+    "AVS 756.1234.5678.97 IBAN CH9300762011623852957 date 2025-09-09",
+    "Habite rue du Lac 12, av. de la Gare 3b, route de Genève 101, ch. des Vignes 7.",
+    "Avenue Louis-Ruchonnet 2A; chemin de l'Église; Rt. Cantonale 15; rue d’Italie",
+    "rue St.-Jean. 12 / rue abc-1 / av.x / chemin  \t  Bel-Air   4 / ch. Côte 1234 5",
+    "IBAN CH9300762011623852957",
+    "client CUST-004512",
+    "facture INV-2025-000123",
+    "AVS 756.1234.5678.97",
+]
+
+# Valeurs que anonymize() doit taguer avec ce type, entières: les détecteurs spécifiques
+# l'emportent sur PHONE / PERSON_NAME / DATE quand ils se chevauchent
+EXPECTED_TAGS = [
+    ("IBAN CH9300762011623852957", "IBAN", "CH9300762011623852957"),
+    ("client CUST-004512", "CLIENT_ID", "CUST-004512"),
+    ("facture INV-2025-000123", "INVOICE", "INV-2025-000123"),
+    ("AVS 756.1234.5678.97", "AHV", "756.1234.5678.97"),
+    ("AVS 756.1234.5678.97 IBAN CH9300762011623852957 date 2025-09-09", "AHV", "756.1234.5678.97"),
+    ("AVS 756.1234.5678.97 IBAN CH9300762011623852957 date 2025-09-09", "IBAN", "CH9300762011623852957"),
+    ("voir https://ex.com/a?u=jean@ex.com", "EMAIL", "jean@ex.com"),
+]
+
+_FUZZ_ALPHABETS = {
+    "PHONE": list("0123456789 +().-\n41a"),
+    "ADDRESS_HINT": ["rue", "route", "rt", "rt.", "av", "av.", "avenue", "ch", "ch.", "chemin",
+                     " ", "  ", "\t", "é", "a", "B", "'", "’", ".", "-", "1", "12", "1234",
+                     "12345", "b", "_", "x", "\n"],
+}
+
+# Entrées pire-cas (répétées jusqu'à ~size caractères)
+ADVERSARIAL = {
+    "zéros < 8 chiffres": "0000000  ",
+    "séparateurs csv": "0.0.0.0.0.0.0,,",
+    "préfixe +41 tronqué": "+41 (0) 0 0 0 0 0  ",
+    "chiffres continus": "0",
+    "rue + ponctuation": "rue ." + "-" * 50 + " ",
+    "rue + espaces": "rue a" + " " * 200 + "12345",
+    "mots-clés en chaîne": "rue ch. av ",
+}
+
+
+def check_regressions(fuzz: int = 20000, seed: int = 1) -> List[str]:
+    """
+    Compare les spans des détecteurs réécrits à LEGACY_PATTERNS, et vérifie EXPECTED_TAGS
+    (priorités entre détecteurs). Retour: liste des écarts.
+    """
+    rnd = random.Random(seed)
+    errors = []
+    for text, kind, value in EXPECTED_TAGS:
+        mapping = anonymize(text, BENCH_SECRET).mapping
+        if not any(v == value and tag[2:-13] == kind for tag, v in mapping.items()):
+            errors.append(f"{kind}: {text!r} -> {sorted(mapping.values())}")
+    for kind, old in LEGACY_PATTERNS.items():
+        new = DETECTORS[kind].pattern
+        samples = list(REGRESSION_CORPUS)
+        alphabet = _FUZZ_ALPHABETS[kind]
+        samples += ["".join(rnd.choice(alphabet) for _ in range(rnd.randint(1, 40))) for _ in range(fuzz)]
+        for text in samples:
+            expected = [m.span() for m in old.finditer(text)]
+            if [m.span() for m in new.finditer(text)] != expected:
+                errors.append(f"{kind}: {text!r}")
+    return errors
+
+
+def adversarial_timings(size: int = 200_000) -> Dict[str, Dict[str, float]]:
+    """Secondes par MB sur chaque entrée pire-cas: détecteurs seuls et anonymize() complet."""
+    report = {}
+    for name, unit in ADVERSARIAL.items():
+        text = (unit * (size // len(unit) + 1))[:size]
+        mb = len(text.encode("utf-8")) / 1e6
+        row = {}
+        for kind in LEGACY_PATTERNS:
+            t0 = time.perf_counter()
+            for _ in DETECTORS[kind].pattern.finditer(text):
+                pass
+            row[kind] = (time.perf_counter() - t0) / mb
+        t0 = time.perf_counter()
+        anonymize(text, BENCH_SECRET)
+        row["anonymize"] = (time.perf_counter() - t0) / mb
+        report[name] = row
+    return report
+
+
+def legacy_anonymize(text: str, secret: bytes, mode: str = "placeholder") -> AnonResult:
+    # Ancien moteur: un rx.sub() complet par type (référence de comparaison)
+    text = _normalize(text)
+    mapping: Dict[str, str] = {}
+    for kind, rx in PATTERNS.items():
+        def repl(m, kind=kind):
+            val = m.group(0)
+            tag = _stable_tag(secret, kind, val)
+            mapping[tag] = val
+            return f"{tag}({_mask_value(kind, val)})" if mode == "redact" else tag
+        text = rx.sub(repl, text)
+    return AnonResult(text=text, mapping=mapping)
+
+
+def legacy_deanonymize(text: str, mapping: Dict[str, str]) -> str:
+    # Ancienne boucle: un text.replace() par tag, tags les plus longs d'abord
+    for tag, val in sorted(mapping.items(), key=lambda kv: -len(kv[0])):
+        text = text.replace(tag, val)
+    return text
+
+
+def make_corpus(size: int, density: float = 0.05, seed: int = 42) -> str:
+    """Texte synthétique d'environ `size` caractères; `density` = part des mots remplacés par une PII."""
+    rnd = random.Random(seed)
+    words = []
+    total = 0
+    while total < size:
+        w = rnd.choice(_PII) if rnd.random() < density else rnd.choice(_FILLER)
+        words.append(w)
+        total += len(w) + 1
+    return " ".join(words)
+
+
+_FIRST_NAMES = ["Jean", "Marie", "Luca", "Sophie", "Nicolas", "Laura", "Pierre", "Anna"]
+_LAST_NAMES = ["Dupont", "Favre", "Rochat", "Müller", "Bianchi", "Meier", "Perrin", "Gerber"]
+_STREETS = ["rue du Lac", "avenue de la Gare", "ch. des Vignes", "route de Genève",
+            "rue de Lausanne", "av. du Léman", "chemin de Bel-Air"]
+
+
+def _swiss_pii(rnd: random.Random) -> str:
+    # Une PII suisse aléatoire (formats réalistes, valeurs non valides)
+    kind = rnd.randrange(6)
+    if kind == 0:
+        return f"+41 7{rnd.randint(5, 9)} {rnd.randint(100, 999)} {rnd.randint(10, 99)} {rnd.randint(10, 99)}"
+    if kind == 1:
+        return f"0{rnd.randint(21, 91)} {rnd.randint(100, 999)} {rnd.randint(10, 99)} {rnd.randint(10, 99)}"
+    if kind == 2:
+        return f"CH{rnd.randint(10, 99)}{rnd.getrandbits(60) % 10**17:017d}"
+    if kind == 3:
+        return f"756.{rnd.randint(1000, 9999)}.{rnd.randint(1000, 9999)}.{rnd.randint(10, 99)}"
+    if kind == 4:
+        return f"{rnd.choice(_FIRST_NAMES)} {rnd.choice(_LAST_NAMES)}"
+    return f"{rnd.choice(_STREETS)} {rnd.randint(1, 200)}"
+
+
+def make_swiss_corpus(size: int, density: float = 0.05, seed: int = 42) -> str:
+    """Comme make_corpus(), avec des PII suisses toutes différentes (téléphones, IBAN, AVS, noms, adresses)."""
+    rnd = random.Random(seed)
+    words = []
+    total = 0
+    while total < size:
+        w = _swiss_pii(rnd) if rnd.random() < density else rnd.choice(_FILLER)
+        words.append(w)
+        total += len(w) + 1
+    return " ".join(words)
+
+
+def throughput(fn: Callable[[str], object], text: str, repeat: int = 3) -> float:
+    """Meilleur débit (MB/s) sur `repeat` exécutions."""
+    size_mb = len(text.encode("utf-8")) / 1e6
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return size_mb / best
+
+
+def batch_scaling(n: int, max_workers: int, prompt_size: int = 2000) -> Dict[int, float]:
+    """Prompts/s de anonymize_many() sur `n` prompts, pour 1..max_workers processus."""
+    prompts = [make_corpus(prompt_size, seed=i) for i in range(min(n, 500))]
+    prompts = (prompts * (n // len(prompts) + 1))[:n]
+    rates = {}
+    for w in range(1, max_workers + 1):
+        t0 = time.perf_counter()
+        for _ in anonymize_many(prompts, BENCH_SECRET, workers=w):
+            pass
+        rates[w] = n / (time.perf_counter() - t0)
+    return rates
+
+
+def deanon_timing(mapping_size: int, response_size: int = 20000) -> Dict[str, float]:
+    """Secondes par réponse (~response_size caractères) avec un mapping de `mapping_size` tags."""
+    anon = anonymize(make_corpus(response_size, density=0.2), BENCH_SECRET)
+    mapping = dict(anon.mapping)
+    i = 0
+    while len(mapping) < mapping_size:
+        mapping[_stable_tag(BENCH_SECRET, "EMAIL", f"user{i}@example.com")] = f"user{i}@example.com"
+        i += 1
+    timings = {}
+    for name, fn in (("single-scan", deanonymize), ("legacy (replace / tag)", legacy_deanonymize)):
+        t0 = time.perf_counter()
+        fn(anon.text, mapping)
+        timings[name] = time.perf_counter() - t0
+    return timings
+
+
+CSV_HEADER = "Index,User Id,First Name,Last Name,Email,Phone,Date of birth,Job Title\n"
+
+
+def csv_rows_per_s(n_rows: int, workers: int = 1) -> float:
+    """Lignes/s de anonymize_csv() sur un CSV synthétique de `n_rows` lignes (en mémoire)."""
+    rnd = random.Random(7)
+    lines = [CSV_HEADER]
+    for i in range(n_rows):
+        lines.append(f"{i},{rnd.getrandbits(48):012x},Jean,Dupont,jean{i}@example.com,"
+                     f"+41 79 {rnd.randint(100, 999)} {rnd.randint(10, 99)} {rnd.randint(10, 99)},"
+                     f"1980-0{rnd.randint(1, 9)}-1{rnd.randint(0, 9)},Ingénieur\n")
+    src = io.StringIO("".join(lines))
+    t0 = time.perf_counter()
+    anonymize_csv(src, io.StringIO(), BENCH_SECRET, columns={"Email": ["EMAIL"], "Phone": ["PHONE"]},
+                  whole={"Last Name": "PERSON_NAME"}, workers=workers)
+    return n_rows / (time.perf_counter() - t0)
+
+
+class _NullWriter:
+    def write(self, data) -> int:
+        return len(data)
+
+
+def file_memory_report(size_mb: float) -> Dict[str, Dict[str, float]]:
+    """
+    Fichier ASCII de `size_mb` MB: temps, pic mémoire Python (tracemalloc) et copies/MB
+    (= pic / taille) pour le chemin str (read + anonymize) et le chemin mmap/bytes.
+    Les pages mmap appartiennent au cache de l'OS et ne sont pas comptées. Le pic inclut ce
+    qui est proportionnel au nombre de matches (spans, cache de tags, mapping), commun aux
+    deux chemins: l'écart entre eux est la copie du texte (lecture str et sortie jointe).
+    """
+    text = make_corpus(int(size_mb * 1e6)).replace("è", "e")
+    size = len(text)
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="ascii") as f:
+        f.write(text)
+        path = f.name
+    del text
+
+    def str_path():
+        with open(path, "r", encoding="utf-8") as fh:
+            result = anonymize(fh.read(), BENCH_SECRET)
+        _NullWriter().write(result.text.encode("utf-8"))
+
+    def mmap_path():
+        anonymize_file(path, _NullWriter(), BENCH_SECRET)
+
+    report = {}
+    try:
+        for name, fn in (("str (read + anonymize)", str_path), ("mmap + regex bytes", mmap_path)):
+            # Temps mesuré sans tracemalloc (qui ralentit chaque allocation), cache de tags vidé
+            get_tag_cache(BENCH_SECRET).clear()
+            t0 = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - t0
+            get_tag_cache(BENCH_SECRET).clear()
+            tracemalloc.start()
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            report[name] = {"seconds": elapsed, "peak_mb": peak / 1e6, "copies_per_mb": peak / size}
+    finally:
+        os.remove(path)
+    return report
+
+
+def _best(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_case(size: int, density: float, repeat: int = 3) -> Dict[str, Any]:
+    """Une mesure (meilleur temps sur `repeat`) pour un corpus de `size` caractères."""
+    text = make_swiss_corpus(size, density)
+    mb = len(text.encode("utf-8")) / 1e6
+    tags = get_tag_cache(BENCH_SECRET)
+
+    def anon():
+        tags.clear()  # cache de tags froid: mesure le coût HMAC réel
+        return anonymize(text, BENCH_SECRET)
+
+    def redact():
+        tags.clear()
+        return anonymize(text, BENCH_SECRET, mode="redact")
+
+    anonymize_s = _best(anon, repeat)
+    redact_s = _best(redact, repeat)
+    result = anon()
+    deanonymize_s = _best(lambda: deanonymize(result.text, result.mapping), repeat)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "map.json")
+        save_s = _best(lambda: save_mapping(path, result.mapping, BENCH_SECRET), repeat)
+        load_s = _best(lambda: load_mapping(path, BENCH_SECRET), repeat)
+    kinds = {kind: {"seconds": round(row["prefilter_s"] + row["regex_s"], 6), "matches": row["matches"]}
+             for kind, row in profile_detectors(text).items()}
+    return {"size": size, "density": density, "mb": round(mb, 4), "tags": len(result.mapping),
+            "anonymize_s": anonymize_s, "anonymize_mb_s": round(mb / anonymize_s, 3),
+            "redact_s": redact_s,
+            "deanonymize_s": deanonymize_s, "save_mapping_s": save_s, "load_mapping_s": load_s,
+            "kinds": kinds}
+
+
+def run_suite(sizes: List[int], densities: List[float], repeat: int = 3) -> Dict[str, Any]:
+    """Toutes les combinaisons taille x densité. Retour: dict sérialisable en JSON."""
+    return {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(),
+                 "date": time.strftime("%Y-%m-%dT%H:%M:%S"), "repeat": repeat},
+        "runs": [bench_case(size, density, repeat) for size in sizes for density in densities],
+    }
+
+
+_TIMED = ("anonymize_s", "redact_s", "deanonymize_s", "save_mapping_s", "load_mapping_s")
+
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any],
+                        tolerance: float = 0.25) -> List[str]:
+    """Mesures plus lentes que la référence de plus de `tolerance` (0.25 = +25 %). Retour: messages."""
+    ref = {(r["size"], r["density"]): r for r in baseline.get("runs", [])}
+    regressions = []
+    for run in results["runs"]:
+        old = ref.get((run["size"], run["density"]))
+        if old is None:
+            continue
+        for key in _TIMED:
+            if old.get(key) and run[key] > old[key] * (1 + tolerance):
+                regressions.append(f"{key} taille={run['size']} densité={run['density']}: "
+                                   f"{old[key] * 1000:.2f} ms -> {run[key] * 1000:.2f} ms "
+                                   f"(+{run[key] / old[key] - 1:.0%})")
+    return regressions
+
+
+def profiled(fn: Callable[[], Any], mode: str, out: str | None = None, top: int = 15) -> Tuple[Any, str]:
+    """
+    Exécute fn() sous cProfile ("cprofile") ou tracemalloc ("tracemalloc").
+    Retour: (résultat de fn, rapport texte); avec cProfile, `out` reçoit les stats brutes (pstats).
+    """
+    if mode == "cprofile":
+        prof = cProfile.Profile()
+        value = prof.runcall(fn)
+        if out:
+            prof.dump_stats(out)
+        buf = io.StringIO()
+        pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(top)
+        return value, buf.getvalue()
+    tracemalloc.start()
+    try:
+        value = fn()
+        snap = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    lines = [f"pic mémoire Python: {peak / 1e6:.1f} MB"]
+    lines += [str(stat) for stat in snap.statistics("lineno")[:top]]
+    return value, "\n".join(lines)
+
+
+def print_suite(results: Dict[str, Any]) -> None:
+    for run in results["runs"]:
+        print(f"taille {run['mb']:.2f} MB, densité {run['density']:.0%}, {run['tags']} tags")
+        print(f"  anonymize    {run['anonymize_s'] * 1000:10.2f} ms  ({run['anonymize_mb_s']:.2f} MB/s)")
+        for key in _TIMED[1:]:
+            print(f"  {key[:-2]:<12} {run[key] * 1000:10.2f} ms")
+        kinds = sorted(run["kinds"].items(), key=lambda kv: -kv[1]["seconds"])
+        print("  par détecteur: " + ", ".join(f"{k}={v['seconds'] * 1000:.1f}ms" for k, v in kinds))
+
+
+def cold_start(runs: int = 10) -> Dict[str, float]:
+    """
+    Démarrage à froid du CLI (nouveau processus): meilleur temps sur `runs`, en ms au-delà
+    d'un interpréteur vide (`python -c pass`), pour genkey et anon (un type / tous les types).
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompt_privacy.py")
+    key = "k" * 32
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as f:
+        f.write("Écrire à jean@ex.com ou au +41 79 123 45 67.\n")
+        sample = f.name
+    commands = {
+        "python (vide)": [sys.executable, "-c", "pass"],
+        "genkey": [sys.executable, script, "genkey"],
+        "anon --include EMAIL": [sys.executable, script, "anon", "--in", sample, "--secret", key,
+                                 "--include", "EMAIL"],
+        "anon (tous les types)": [sys.executable, script, "anon", "--in", sample, "--secret", key],
+    }
+    best = {}
+    try:
+        for name, cmd in commands.items():
+            best[name] = float("inf")
+            for _ in range(runs):
+                t0 = time.perf_counter()
+                subprocess.run(cmd, stdout=subprocess.DEVNULL, check=True)
+                best[name] = min(best[name], time.perf_counter() - t0)
+    finally:
+        os.remove(sample)
+    base = best.pop("python (vide)")
+    return {name: (secs - base) * 1000 for name, secs in best.items()}
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Benchmark anonymize() (MB/s).")
+    p.add_argument("--size-mb", type=float, default=4.0, help="Taille du prompt synthétique (MB).")
+    p.add_argument("--density", type=float, default=0.05, help="Part des mots remplacés par une PII.")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--batch", type=int, default=0, help="Nombre de prompts pour le test anonymize_many().")
+    p.add_argument("--mapping-size", type=int, default=100000, help="Taille du mapping pour deanonymize().")
+    p.add_argument("--csv-rows", type=int, default=0, help="Lignes du CSV synthétique pour anonymize_csv().")
+    p.add_argument("--workers", type=int, default=1, help="Processus pour --csv-rows.")
+    p.add_argument("--file-mb", type=float, default=0, help="Taille du fichier pour comparer str et mmap.")
+    p.add_argument("--adversarial", action="store_true", help="Non-régression + entrées pire-cas.")
+    p.add_argument("--ceiling", type=float, default=2.0, help="Plafond (s/MB) pour --adversarial.")
+    args = p.parse_args(argv)
+
+    if args.adversarial:
+        errors = check_regressions()
+        print(f"Non-régression PHONE/ADDRESS_HINT et priorités: {len(errors)} écart(s)")
+        for e in errors[:10]:
+            print("  ", e)
+        slow = []
+        for name, row in adversarial_timings().items():
+            print(f"  {name:<22} " + "  ".join(f"{k}={v:.3f}s/MB" for k, v in row.items()))
+            slow += [f"{name}/{k}" for k, v in row.items() if v > args.ceiling]
+        if slow:
+            print(f"Plafond de {args.ceiling} s/MB dépassé: {', '.join(slow)}")
+        return 1 if errors or slow else 0
+
+    text = make_corpus(int(args.size_mb * 1e6), args.density)
+    engines = {
+        "1 scan / type, priorités": lambda t: anonymize(t, BENCH_SECRET),
+        "legacy (1 sub / type)": lambda t: legacy_anonymize(t, BENCH_SECRET),
+        "1 scan / type redact": lambda t: anonymize(t, BENCH_SECRET, mode="redact"),
+        "legacy redact": lambda t: legacy_anonymize(t, BENCH_SECRET, mode="redact"),
+    }
+    print(f"Prompt: {len(text) / 1e6:.1f} MB, densité PII {args.density:.0%}")
+    for name, fn in engines.items():
+        print(f"  {name:<24} {throughput(fn, text, args.repeat):8.2f} MB/s")
+    print(f"  cache de tags: {get_tag_cache(BENCH_SECRET).stats()}")
+
+    print(f"deanonymize(): réponse de 20 kB, mapping de {args.mapping_size} tags")
+    for name, secs in deanon_timing(args.mapping_size).items():
+        print(f"  {name:<24} {secs * 1000:10.2f} ms")
+
+    if args.csv_rows:
+        rate = csv_rows_per_s(args.csv_rows, args.workers)
+        print(f"anonymize_csv(): {args.csv_rows} lignes, {args.workers} worker(s): {rate:,.0f} lignes/s")
+
+    if args.file_mb:
+        print(f"anonymize_file(): fichier ASCII de {args.file_mb} MB")
+        for name, row in file_memory_report(args.file_mb).items():
+            print(f"  {name:<24} {row['seconds']:7.2f} s  pic {row['peak_mb']:8.1f} MB"
+                  f"  {row['copies_per_mb']:5.2f} copies/MB")
+
+    if args.batch:
+        print(f"anonymize_many(): {args.batch} prompts")
+        rates = batch_scaling(args.batch, os.cpu_count() or 1)
+        for w, rate in rates.items():
+            print(f"  {w:>2} worker(s) {rate:10.0f} prompts/s  (x{rate / rates[1]:.2f})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
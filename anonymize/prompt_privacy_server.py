@@ -0,0 +1,223 @@
+"""
+prompt_privacy_server.py — Serveur local d'anonymisation (asyncio, HTTP/1.1 minimal, stdlib).
+
+Garde en mémoire ce que chaque appel CLI recalcule: patterns compilés, HMAC pré-clé
+(TagCache) et mapping. Écoute en TCP (127.0.0.1 par défaut) ou sur une socket Unix.
+
+Endpoints (JSON):
+    POST /anon    {"text": "...", "include": [...], "exclude": [...], "mode": "redact"}
+                  -> {"text": "...", "tags": 3}
+    POST /deanon  {"text": "..."} -> {"text": "..."}
+    GET  /stats   -> compteurs, débit et latences p50/p99 par endpoint
+
+Lancement:
+    python prompt_privacy.py serve --port 8765 --mapping map.db --secret-file .key
+    curl -s localhost:8765/anon -d '{"text": "Écrire à jean@ex.com"}'
+"""
+
+from __future__ import annotations
+from typing import Any, Dict, Tuple
+import asyncio
+import json
+import signal
+import time
+from collections import deque
+
+from prompt_privacy import (ResultCache, TagCache, anonymize, deanonymize, save_mapping,
+                            _check_secret, _patterns, _select_kinds)
+
+
+class LatencyStats:
+    """Compteurs d'un endpoint + fenêtre glissante des dernières latences (pour p50/p99)."""
+
+    def __init__(self, window: int = 10000):
+        self.samples: deque = deque(maxlen=window)
+        self.count = 0
+        self.errors = 0
+        self.bytes_in = 0
+
+    def record(self, seconds: float, size: int) -> None:
+        self.samples.append(seconds)
+        self.count += 1
+        self.bytes_in += size
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self, uptime: float) -> Dict[str, Any]:
+        return {
+            "requests": self.count,
+            "errors": self.errors,
+            "req_per_s": round(self.count / uptime, 2) if uptime else 0.0,
+            "mb_per_s": round(self.bytes_in / 1e6 / uptime, 4) if uptime else 0.0,
+            "p50_ms": round(self.percentile(0.50) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+        }
+
+
+def _check_payload(payload: Any) -> Dict[str, Any]:
+    """Vérifie les types du corps JSON (TypeError -> réponse 400, jamais une connexion coupée)."""
+    if not isinstance(payload, dict):
+        raise TypeError("corps JSON: objet attendu")
+    if not isinstance(payload.get("text"), str):
+        raise TypeError('"text": chaîne attendue')
+    for key in ("include", "exclude"):
+        kinds = payload.get(key)
+        if kinds is not None and not (isinstance(kinds, list) and all(isinstance(k, str) for k in kinds)):
+            raise TypeError(f'"{key}": liste de chaînes attendue')
+    if not isinstance(payload.get("mode", ""), str):
+        raise TypeError('"mode": chaîne attendue')
+    return payload
+
+
+class PrivacyServer:
+    """
+    État partagé du serveur. Le travail d'anonymisation est fait dans la boucle asyncio
+    (CPU, court): pas de verrou nécessaire sur le mapping ni sur le TagCache.
+    - mapping: dict (sauvé en JSON toutes les `flush_interval` secondes s'il a grandi, et
+      par close()) ou MappingStore (complété à chaque requête).
+    - result_cache: ResultCache optionnel (prompts système/templates répétés).
+    """
+
+    MAX_BODY = 16 << 20
+
+    def __init__(self, secret: bytes, mapping=None, mapping_path: str | None = None,
+                 mode: str = "placeholder", result_cache: ResultCache | None = None,
+                 flush_interval: float = 5.0):
+        _check_secret(secret)
+        self.secret = secret
+        self.tags = TagCache(secret)
+        self.mapping = {} if mapping is None else mapping
+        self.mapping_path = mapping_path
+        self.flush_interval = flush_interval
+        self._saved_size = len(self.mapping)  # taille du mapping à la dernière sauvegarde
+        self.mode = mode
+        self.result_cache = result_cache
+        self.started = time.monotonic()
+        self.stats = {"/anon": LatencyStats(), "/deanon": LatencyStats()}
+        _patterns(_select_kinds(None, None))  # patterns par défaut compilés dès le démarrage
+
+    # ------------------------- Endpoints -------------------------
+
+    def anon(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        result = anonymize(payload["text"], self.secret, include=payload.get("include"),
+                           exclude=payload.get("exclude"), mode=payload.get("mode", self.mode),
+                           tag_cache=self.tags, result_cache=self.result_cache)
+        self.mapping.update(result.mapping)
+        return {"text": result.text, "tags": len(result.mapping)}
+
+    def deanon(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return {"text": deanonymize(payload["text"], self.mapping)}
+
+    def snapshot(self) -> Dict[str, Any]:
+        uptime = time.monotonic() - self.started
+        return {"uptime_s": round(uptime, 1), "mapping_size": len(self.mapping),
+                "tag_cache": self.tags.stats(),
+                "result_cache": self.result_cache.stats() if self.result_cache else None,
+                "endpoints": {path: s.snapshot(uptime) for path, s in self.stats.items()}}
+
+    # --------------------------- HTTP ----------------------------
+
+    def dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        if method == "GET" and path == "/stats":
+            return 200, self.snapshot()
+        if method != "POST" or path not in self.stats:
+            return 404, {"error": f"{method} {path} inconnu"}
+        stats = self.stats[path]
+        t0 = time.perf_counter()
+        try:
+            payload = _check_payload(json.loads(body or b"{}"))
+            out = self.anon(payload) if path == "/anon" else self.deanon(payload)
+        except (ValueError, KeyError, TypeError) as e:
+            stats.errors += 1
+            return 400, {"error": str(e)}
+        stats.record(time.perf_counter() - t0, len(body))
+        return 200, out
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                method, path, version = lines[0].split(" ", 2)
+                headers = {k.strip().lower(): v.strip()
+                           for k, _, v in (line.partition(":") for line in lines[1:] if line)}
+                length = int(headers.get("content-length", 0))
+                if length > self.MAX_BODY:
+                    status, out = 413, {"error": "corps trop grand"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, out = self.dispatch(method, path.split("?", 1)[0], body)
+                    keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                data = json.dumps(out, ensure_ascii=False).encode("utf-8")
+                writer.write(f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                             f"Content-Type: application/json; charset=utf-8\r\n"
+                             f"Content-Length: {len(data)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _pending(self) -> bool:
+        # Un dict à sauver a grandi depuis la dernière sauvegarde (les entrées ne sont qu'ajoutées)
+        return (isinstance(self.mapping, dict) and bool(self.mapping_path)
+                and len(self.mapping) != self._saved_size)
+
+    async def flush(self) -> None:
+        # Sauvegarde en cours de service: copie dans la boucle, écriture JSON dans un thread
+        if self._pending():
+            snapshot = dict(self.mapping)
+            await asyncio.to_thread(save_mapping, self.mapping_path, snapshot, self.secret)
+            self._saved_size = len(snapshot)
+
+    def close(self) -> None:
+        # Un MappingStore est déjà à jour (ajouts par requête); un dict est sauvé en JSON signé
+        if isinstance(self.mapping, dict):
+            if self._pending():
+                save_mapping(self.mapping_path, self.mapping, self.secret)
+                self._saved_size = len(self.mapping)
+        else:
+            self.mapping.close()
+
+
+async def serve(server: PrivacyServer, host: str = "127.0.0.1", port: int = 8765,
+                unix_path: str | None = None) -> None:
+    if unix_path:
+        srv = await asyncio.start_unix_server(server.handle, path=unix_path)
+    else:
+        srv = await asyncio.start_server(server.handle, host, port)
+    # Arrêt propre sur SIGINT/SIGTERM, pour que close() sauve le mapping
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):  # Windows
+            pass
+    where = unix_path or f"http://{host}:{port}"
+    print(f"prompt_privacy: écoute sur {where} (Ctrl-C pour arrêter)", flush=True)
+    async with srv:
+        # Le mapping JSON est sauvé périodiquement: un arrêt brutal ne perd que le dernier intervalle
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), server.flush_interval or None)
+            except asyncio.TimeoutError:
+                await server.flush()
+
+
+def run(server: PrivacyServer, host: str = "127.0.0.1", port: int = 8765,
+        unix_path: str | None = None) -> None:
+    try:
+        asyncio.run(serve(server, host, port, unix_path))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
@@ -0,0 +1,192 @@
+"""
+prompt_privacy_store.py — Stockage persistant et incrémental du mapping (sqlite3, stdlib).
+
+Alternative à save_mapping()/load_mapping() pour les mappings qui grossissent pendant
+toute la vie d'un service: chaque nouvelle entrée est AJOUTÉE (pas de réécriture du
+fichier), et l'intégrité est assurée par une chaîne HMAC:
+
+    mac_n = HMAC-SHA256(secret, mac_{n-1} | tag | valeur)
+
+plus un MAC de tête (nombre d'entrées + dernier mac) qui détecte une troncature.
+
+    from prompt_privacy_store import MappingStore
+    with MappingStore("map.db", secret) as store:
+        store.update(result.mapping)          # O(1) par entrée
+        original = deanonymize(text, store)   # lookups par tag, sans tout charger
+
+Comme pour le JSON, les valeurs sont signées, pas chiffrées.
+"""
+
+from __future__ import annotations
+from typing import Dict, Iterator, Mapping, Tuple
+import hmac
+import hashlib
+import sqlite3
+
+
+_GENESIS = "0" * 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    seq   INTEGER PRIMARY KEY,
+    tag   TEXT NOT NULL UNIQUE,
+    value TEXT NOT NULL,
+    mac   TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class MappingStore:
+    """
+    Mapping tag -> valeur persistant, en ajout seul, avec chaînage HMAC.
+    - update()/add(): ajoute les tags absents (un tag existant n'est jamais réécrit).
+    - get()/[]/in: lecture d'une entrée par index, MAC de la ligne vérifié.
+    - verify(): revérifie toute la chaîne et le MAC de tête.
+    - compact(): checkpoint du journal WAL + VACUUM (appelé aussi toutes les
+      `compact_every` entrées ajoutées si > 0).
+    """
+
+    def __init__(self, path: str, secret: bytes, compact_every: int = 0):
+        self.path = path
+        self._hmac = hmac.new(secret, digestmod=hashlib.sha256)
+        self.compact_every = compact_every
+        self._since_compact = 0
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._count, self._last_mac = self._read_head()
+
+    # -------------------------- MAC --------------------------
+
+    def _mac(self, prev: str, tag: str, value: str) -> str:
+        h = self._hmac.copy()
+        h.update(f"{prev}|{tag}|{value}".encode("utf-8"))
+        return h.hexdigest()
+
+    def _head_mac(self, count: int, last_mac: str) -> str:
+        h = self._hmac.copy()
+        h.update(f"head|{count}|{last_mac}".encode("utf-8"))
+        return h.hexdigest()
+
+    def _read_head(self) -> Tuple[int, str]:
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'head'").fetchone()
+        if row is None:
+            return 0, _GENESIS
+        count, last_mac, head = row[0].split(":")
+        if not hmac.compare_digest(head, self._head_mac(int(count), last_mac)):
+            raise ValueError("Mapping corrompu: MAC de tête invalide (secret incorrect ou fichier altéré).")
+        return int(count), last_mac
+
+    # ------------------------ Écriture -----------------------
+
+    def update(self, mapping: Mapping[str, str]) -> int:
+        """
+        Ajoute les entrées absentes en une transaction. Retour: nombre d'entrées ajoutées.
+        La tête (nombre d'entrées, dernier mac) est relue sous verrou d'écriture (BEGIN IMMEDIATE):
+        un autre processus peut avoir ajouté des entrées depuis la dernière lecture.
+        """
+        db = self._db
+        added = 0
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            count, last_mac = self._read_head()
+            for tag, value in mapping.items():
+                mac = self._mac(last_mac, tag, value)
+                # Seul un tag déjà présent est ignoré; un conflit sur seq lève IntegrityError
+                cur = db.execute("INSERT INTO entries (seq, tag, value, mac) VALUES (?, ?, ?, ?) "
+                                 "ON CONFLICT (tag) DO NOTHING", (count + 1, tag, value, mac))
+                if cur.rowcount == 0:  # tag déjà présent
+                    continue
+                count, last_mac = count + 1, mac
+                added += 1
+            if added:
+                db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('head', ?)",
+                           (f"{count}:{last_mac}:{self._head_mac(count, last_mac)}",))
+        except BaseException:
+            db.rollback()
+            raise
+        db.commit()
+        self._count, self._last_mac = count, last_mac
+        self._since_compact += added
+        if self.compact_every and self._since_compact >= self.compact_every:
+            self.compact()
+        return added
+
+    def add(self, tag: str, value: str) -> bool:
+        return self.update({tag: value}) == 1
+
+    def __setitem__(self, tag: str, value: str) -> None:
+        self.add(tag, value)
+
+    # ------------------------- Lecture -----------------------
+
+    def get(self, tag: str, default: str | None = None) -> str | None:
+        row = self._db.execute("SELECT seq, value, mac FROM entries WHERE tag = ?", (tag,)).fetchone()
+        if row is None:
+            return default
+        seq, value, mac = row
+        prev = _GENESIS
+        if seq > 1:
+            prev = self._db.execute("SELECT mac FROM entries WHERE seq = ?", (seq - 1,)).fetchone()[0]
+        if not hmac.compare_digest(mac, self._mac(prev, tag, value)):
+            raise ValueError(f"Mapping corrompu: MAC invalide pour l'entrée {seq}.")
+        return value
+
+    def __getitem__(self, tag: str) -> str:
+        value = self.get(tag)
+        if value is None:
+            raise KeyError(tag)
+        return value
+
+    def __contains__(self, tag: object) -> bool:
+        return self._db.execute("SELECT 1 FROM entries WHERE tag = ?", (tag,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def items(self) -> Iterator[Tuple[str, str]]:
+        for tag, value in self._db.execute("SELECT tag, value FROM entries ORDER BY seq"):
+            yield tag, value
+
+    def to_dict(self) -> Dict[str, str]:
+        self.verify()
+        return dict(self.items())
+
+    # ------------------------ Maintenance --------------------
+
+    def verify(self) -> int:
+        """Revérifie toute la chaîne HMAC. Retour: nombre d'entrées; ValueError si altéré."""
+        prev = _GENESIS
+        n = 0
+        for seq, tag, value, mac in self._db.execute("SELECT seq, tag, value, mac FROM entries ORDER BY seq"):
+            n += 1
+            if seq != n or not hmac.compare_digest(mac, self._mac(prev, tag, value)):
+                raise ValueError(f"Mapping corrompu: chaîne HMAC rompue à l'entrée {seq}.")
+            prev = mac
+        if (n, prev) != self._read_head():
+            raise ValueError("Mapping corrompu: entrées manquantes ou ajoutées hors chaîne.")
+        return n
+
+    def compact(self) -> None:
+        self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._db.execute("VACUUM")
+        self._since_compact = 0
+
+    def import_json(self, path: str, secret: bytes) -> int:
+        """Importe un mapping JSON signé par save_mapping(). Retour: nombre d'entrées ajoutées."""
+        from prompt_privacy import load_mapping
+        return self.update(load_mapping(path, secret))
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "MappingStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
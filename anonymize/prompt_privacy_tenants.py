@@ -0,0 +1,267 @@
+"""
+prompt_privacy_tenants.py — Secrets et mappings par client (multi-tenant), en mémoire partagée.
+
+Une passerelle qui sert plusieurs clients garde ici, pour chacun: son secret, son TagCache
+(HMAC pré-clé) et son mapping, chargé une seule fois puis complété en mémoire.
+- Isolation: chaque client a son propre secret, cache de tags, mapping et fichier.
+- LRU: au-delà de `max_tenants` (ou après `idle_seconds` sans requête), le client le moins
+  récemment utilisé est sauvé puis retiré de la mémoire.
+- Un thread de fond sauve les mappings modifiés toutes les `flush_interval` secondes.
+- Thread-safe: un verrou par client; le verrou du registre ne protège que l'index.
+
+    from prompt_privacy_tenants import TenantRegistry
+    registry = TenantRegistry({"acme": key_acme, "globex": key_globex}, mapping_dir="maps/")
+    result = registry.anonymize("acme", prompt)
+    answer = registry.deanonymize("acme", llm_output)
+    registry.close()   # arrête le thread de fond et sauve les mappings modifiés
+"""
+
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Mapping, Tuple
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from prompt_privacy import (AnonResult, TagCache, anonymize, deanonymize, load_mapping,
+                            save_mapping, _check_secret)
+
+
+# Identifiant de client utilisable tel quel comme nom de fichier
+_TENANT_RX = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9_.-]{0,127}")
+
+
+class Tenant:
+    """
+    État d'un client. Le mapping est chargé au premier usage (sous le verrou du client,
+    donc sans bloquer les autres clients) et sauvé par flush() s'il a changé.
+    Le fichier est remplacé de façon atomique; s'il a été réécrit par ailleurs (ancien
+    Tenant du même client encore en cours de requête), il est fusionné avant lecture/écriture.
+    """
+
+    def __init__(self, tenant_id: str, secret: bytes, path: str | None = None,
+                 file_lock: threading.Lock | None = None):
+        _check_secret(secret)
+        self.id = tenant_id
+        self.secret = secret
+        self.path = path
+        self.tags = TagCache(secret)
+        self.mapping: Dict[str, str] = {}
+        self.lock = threading.Lock()
+        # Partagé par tous les Tenant d'un même client: lecture+écriture du fichier indivisibles
+        self.file_lock = file_lock or threading.Lock()
+        self.dirty = False
+        self.evicted = False
+        self.generation = 0  # incrémenté à chaque retrait du registre
+        self.last_used = time.monotonic()
+        self.requests = 0   # compteurs mis à jour sous self.lock
+        self.bytes_in = 0
+        self._stamp = None  # (mtime_ns, taille) du fichier au dernier chargement/écriture
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _sync(self) -> None:
+        # Appelé sous self.lock: (re)charge le fichier s'il a changé depuis notre dernier accès
+        if not self.path:
+            return
+        with self.file_lock:
+            self._sync_file()
+
+    def _sync_file(self) -> None:
+        stamp = self._file_stamp()
+        if stamp is not None and stamp != self._stamp:
+            self.mapping = {**load_mapping(self.path, self.secret), **self.mapping}
+            self._stamp = stamp
+
+    def anonymize(self, text: str, **options: Any) -> AnonResult:
+        """anonymize() avec le secret, le cache de tags et le mapping du client."""
+        with self.lock:
+            self._sync()
+            self.last_used = time.monotonic()
+            self.requests += 1
+            self.bytes_in += len(text)
+            result = anonymize(text, self.secret, tag_cache=self.tags, **options)
+            before = len(self.mapping)
+            self.mapping.update(result.mapping)
+            if len(self.mapping) != before:
+                self.dirty = True
+                if self.evicted:  # retiré du registre pendant la requête: plus de flush de fond
+                    self._flush_locked()
+        return result
+
+    def deanonymize(self, text: str) -> str:
+        with self.lock:
+            self._sync()
+            self.last_used = time.monotonic()
+            self.requests += 1
+            self.bytes_in += len(text)
+            mapping = self.mapping
+        # Lecture seule: un dict complété par un autre thread reste lisible (GIL)
+        return deanonymize(text, mapping)
+
+    def flush(self) -> bool:
+        """Sauve le mapping s'il a changé. Retour: True si un fichier a été écrit."""
+        with self.lock:
+            return self._flush_locked()
+
+    def _flush_locked(self) -> bool:
+        if not (self.dirty and self.path):
+            return False
+        with self.file_lock:
+            self._sync_file()
+            save_mapping(self.path, self.mapping, self.secret)  # écrit un .tmp puis le renomme
+            self._stamp = self._file_stamp()
+        self.dirty = False
+        return True
+
+
+class TenantRegistry:
+    """
+    Registre des clients actifs.
+    - secrets: dict client -> secret, ou fonction client -> secret (KMS, Vault...);
+      un client inconnu lève KeyError.
+    - mapping_dir: dossier des mappings JSON signés (<client>.json); None = en mémoire seulement
+      (le mapping d'un client retiré est alors perdu).
+    - max_tenants: nombre de clients gardés en mémoire (LRU).
+    - idle_seconds: retire aussi les clients inactifs depuis plus longtemps (None = jamais).
+    - flush_interval: période du thread de sauvegarde (0 = pas de thread, flush() manuel).
+    """
+
+    def __init__(self, secrets: Mapping[str, bytes] | Callable[[str], bytes],
+                 mapping_dir: str | None = None, max_tenants: int = 128,
+                 idle_seconds: float | None = None, flush_interval: float = 5.0):
+        self._secret_of = secrets if callable(secrets) else secrets.__getitem__
+        self.mapping_dir = mapping_dir
+        self.max_tenants = max_tenants
+        self.idle_seconds = idle_seconds
+        self._tenants: OrderedDict[str, Tenant] = OrderedDict()
+        self._retiring: Dict[str, Tenant] = {}  # retirés de l'index, pas encore sauvés
+        self._file_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+        self.flushes = 0
+        if mapping_dir:
+            os.makedirs(mapping_dir, exist_ok=True)
+        self._stop = threading.Event()
+        self._thread = None
+        if flush_interval > 0:
+            self._thread = threading.Thread(target=self._run, args=(flush_interval,),
+                                            name="tenant-flush", daemon=True)
+            self._thread.start()
+
+    # ------------------------- Accès -------------------------
+
+    def get(self, tenant_id: str) -> Tenant:
+        """Le Tenant du client (créé au besoin; son mapping est chargé au premier usage)."""
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            if tenant is not None:
+                self._tenants.move_to_end(tenant_id)
+                return tenant
+        if not _TENANT_RX.fullmatch(tenant_id):
+            raise ValueError(f"identifiant de client invalide: {tenant_id!r}")
+        secret = self._secret_of(tenant_id)  # hors verrou: peut être un appel réseau
+        path = os.path.join(self.mapping_dir, tenant_id + ".json") if self.mapping_dir else None
+        evicted: List[Tuple[Tenant, int]] = []
+        with self._lock:
+            tenant = self._tenants.get(tenant_id)
+            if tenant is None:  # pas créé entre-temps par un autre thread
+                # Un client en cours de retrait est repris tel quel (un seul Tenant par client)
+                tenant = self._retiring.pop(tenant_id, None)
+                if tenant is not None:
+                    tenant.evicted = False
+                else:
+                    file_lock = self._file_locks.setdefault(tenant_id, threading.Lock())
+                    tenant = Tenant(tenant_id, secret, path, file_lock)
+                    self.loads += 1
+                self._tenants[tenant_id] = tenant
+                while len(self._tenants) > self.max_tenants:
+                    evicted.append(self._unindex(self._tenants.popitem(last=False)[1]))
+            self._tenants.move_to_end(tenant_id)
+        self._retire(evicted)
+        return tenant
+
+    def anonymize(self, tenant_id: str, text: str, **options: Any) -> AnonResult:
+        return self.get(tenant_id).anonymize(text, **options)
+
+    def deanonymize(self, tenant_id: str, text: str) -> str:
+        return self.get(tenant_id).deanonymize(text)
+
+    # ---------------------- Maintenance ----------------------
+
+    def _unindex(self, tenant: Tenant) -> Tuple[Tenant, int]:
+        # Sous self._lock: le client passe de l'index à la liste des retraits en cours
+        self._tenants.pop(tenant.id, None)
+        self._retiring[tenant.id] = tenant
+        tenant.generation += 1
+        return tenant, tenant.generation
+
+    def _retire(self, evicted: List[Tuple[Tenant, int]]) -> None:
+        # Sauve puis oublie des clients retirés de l'index, sauf s'ils ont été repris
+        # (ou retirés à nouveau: c'est alors ce retrait-là qui s'en charge)
+        for tenant, generation in evicted:
+            def current() -> bool:
+                return self._retiring.get(tenant.id) is tenant and tenant.generation == generation
+            with tenant.lock:
+                if not current():
+                    continue
+                tenant.evicted = True
+                flushed = tenant._flush_locked()
+            with self._lock:
+                self.flushes += flushed
+                if current():  # sinon repris (ou retiré à nouveau) entre-temps: pas compté ici
+                    del self._retiring[tenant.id]
+                    self.evictions += 1
+
+    def evict_idle(self) -> int:
+        """Retire les clients inactifs depuis plus de idle_seconds. Retour: nombre retirés."""
+        if self.idle_seconds is None:
+            return 0
+        limit = time.monotonic() - self.idle_seconds
+        with self._lock:
+            idle = [self._unindex(t) for t in list(self._tenants.values()) if t.last_used < limit]
+        self._retire(idle)
+        return len(idle)
+
+    def flush(self) -> int:
+        """Sauve les mappings modifiés. Retour: nombre de fichiers écrits."""
+        with self._lock:
+            tenants = list(self._tenants.values())
+        written = sum(tenant.flush() for tenant in tenants)
+        with self._lock:
+            self.flushes += written
+        return written
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self.evict_idle()
+            self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs du registre; requests/bytes_in: clients actuellement en mémoire."""
+        with self._lock:
+            tenants = list(self._tenants.values())
+            counters = {"loads": self.loads, "evictions": self.evictions, "flushes": self.flushes}
+        return {"tenants": len(tenants), "max_tenants": self.max_tenants,
+                "dirty": sum(t.dirty for t in tenants),
+                "requests": sum(t.requests for t in tenants),
+                "bytes_in": sum(t.bytes_in for t in tenants), **counters}
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def __enter__(self) -> "TenantRegistry":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
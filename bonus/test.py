@@ -1,25 +1,33 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from pathlib import Path
-from datetime import datetime
-import json, csv, threading, re
+import threading, re, sys
 
-def scan_dir(path: str) -> list[dict]:
+# FileIndex (colonnes compactes) et les exports en flux viennent de day06
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "day06"))
+from myindex6 import FileIndex
+from myexport6 import export_format, export_in_background
+
+def scan_dir(path: str) -> FileIndex:
+    # Même contenu qu'avant (path, name, ext en minuscules, size, mtime ISO) mais rangé
+    # en colonnes: index[i] se lit comme le dict d'avant, pour ~5x moins de mémoire
     p = Path(path)
-    out = []
+    out = FileIndex(style="scan_dir")
     for f in p.rglob("*"):
         if f.is_file():
             st = f.stat()
-            out.append({
-                "path": str(f),
-                "name": f.name,
-                "ext": f.suffix.lower(),
-                "size": st.st_size,
-                "mtime": datetime.fromtimestamp(st.st_mtime).isoformat(timespec="seconds"),
-            })
+            out.add(str(f), st.st_size, st.st_mtime)
     return out
 
 def filter_sort(rows, ext="", pattern="", min_size="", sort_key="size", desc=False):
+    if isinstance(rows, FileIndex):
+        # Une passe sur les colonnes + tri sur clé précalculée, résultat en cache (myquery6)
+        try:
+            ms = int(min_size) if min_size else None
+        except ValueError:
+            ms = None
+        return rows.query(ext=ext.strip(), pattern=pattern, min_size=ms,
+                          sort_key=sort_key, desc=bool(desc))
     res = rows
     if ext:
         e = ext.lower().strip()
@@ -121,22 +129,39 @@ class App(tk.Tk):
         if not self._view:
             messagebox.showinfo("Info", "Rien à exporter.")
             return
-        f = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON","*.json")], initialfile="index.json")
+        f = filedialog.asksaveasfilename(defaultextension=".json", initialfile="index.json",
+                                         filetypes=[("JSON","*.json"), ("JSON Lines","*.jsonl"), ("Compressé","*.gz")])
         if not f: return
-        with open(f, "w", encoding="utf-8") as out:
-            json.dump(self._view, out, indent=2, ensure_ascii=False)
-        self.status.set(f"Export JSON: {f}")
+        # .jsonl: un objet par ligne; sinon (.json, .gz, autre extension) tableau JSON comme
+        # avant (indent=2); un nom en .gz est compressé
+        if export_format(f) in ("jsonl", "ndjson"):
+            self._export_async(f, "JSON", fmt="jsonl")
+        else:
+            self._export_async(f, "JSON", fmt="json", indent=2)
 
     def export_csv(self):
         if not self._view:
             messagebox.showinfo("Info", "Rien à exporter.")
             return
-        f = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV","*.csv")], initialfile="index.csv")
+        f = filedialog.asksaveasfilename(defaultextension=".csv", initialfile="index.csv",
+                                         filetypes=[("CSV","*.csv"), ("CSV compressé","*.csv.gz")])
         if not f: return
-        with open(f, "w", newline="", encoding="utf-8") as out:
-            w = csv.DictWriter(out, fieldnames=["path","name","ext","size","mtime"])
-            w.writeheader(); w.writerows(self._view)
-        self.status.set(f"Export CSV: {f}")
+        self._export_async(f, "CSV", fmt="csv", fieldnames=["path","name","ext","size","mtime"])
+
+    def _export_async(self, f, label, **options):
+        # Écriture en flux dans un thread: l'UI reste fluide. Tkinter n'est pas thread-safe:
+        # le thread d'export ne touche pas à l'UI, c'est la boucle Tk qui relit job.count
+        job = export_in_background(f, self._view, **options)
+        self._poll_export(job, label, len(self._view))
+
+    def _poll_export(self, job, label, total):
+        if job.thread.is_alive():
+            self.status.set(f"Export {label}… {job.count}/{total}")
+            self.after(100, self._poll_export, job, label, total)
+        elif job.error:
+            messagebox.showerror("Erreur", str(job.error))
+        else:
+            self.status.set(f"Export {label}: {job.file} ({job.count} lignes)")
 
 if __name__ == "__main__":
     App().mainloop()
\ No newline at end of file
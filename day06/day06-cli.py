@@ -5,6 +5,7 @@ from urllib.error import URLError
 
 from myutils6 import mylog
 from myutils6 import readfile
+from myutils6 import writejson_file
 from myparser6 import fetch_json
 
 def main():
@@ -20,6 +21,20 @@ def main():
 
     p_test = sub.add_parser("self-test")
 
+    p_index = sub.add_parser("index", help="Index incrémental (sqlite) d'un dossier")
+    p_index.add_argument("path")
+    p_index.add_argument("--db", default="index.db")
+    p_index.add_argument("--pattern", help="Filtre sur l'extension, ex: *.txt (défaut: tous)")
+    p_index.add_argument("--full", action="store_true", help="Restat chaque fichier (modifs en place)")
+    p_index.add_argument("--json", help="Exporte les fichiers indexés (format convert_file)")
+
+    p_dupes = sub.add_parser("find-duplicates", help="Fichiers de contenu identique")
+    p_dupes.add_argument("path")
+    p_dupes.add_argument("--pattern", default="*", help="Filtre sur l'extension, ex: *.jpg,*.png")
+    p_dupes.add_argument("--min-size", type=int, default=1, help="Ignore les fichiers plus petits (octets)")
+    p_dupes.add_argument("--workers", type=int, default=8)
+    p_dupes.add_argument("--json", help="Exporte les groupes de doublons")
+
     args = p.parse_args()
     try:
         if args.cmd == "read-file":
@@ -32,6 +47,28 @@ def main():
             mylog(f"Clés reçues: {list(obj)[:5]}", args.quiet)
             sys.exit(0)
 
+        elif args.cmd == "index":
+            from myindex6 import index_directory, printIndexReport
+            index, report = index_directory(args.path, args.db, args.pattern, args.full)
+            if not args.quiet:
+                printIndexReport(report)
+            if args.json:
+                writejson_file(args.json, index)  # lignes écrites en flux
+            mylog(f"{len(index)} fichiers indexés", args.quiet)
+            sys.exit(0)
+
+        elif args.cmd == "find-duplicates":
+            from myutils6 import scan_directory
+            from mydupes6 import find_duplicates, printDuplicates
+            files = scan_directory(args.path, args.pattern, True)
+            groups, report = find_duplicates(files, args.min_size, args.workers)
+            if not args.quiet:
+                printDuplicates(groups, report)
+            if args.json:
+                writejson_file(args.json, groups)
+            mylog(f"{len(groups)} groupes de doublons", args.quiet)
+            sys.exit(0)
+
         elif args.cmd == "self-test":
             try:
                 readfile(Path("inexistant.txt"))
@@ -0,0 +1,105 @@
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Recherche de doublons par CONTENU (la "key" de convert_file, (nom, taille, mtime),
+# ne voit ni deux copies de noms différents, ni deux fichiers différents de même nom).
+#
+# Trois étages, chacun ne traite que ce qui reste du précédent:
+# 1. regroupement par taille (déjà connue par le scan: aucune lecture);
+# 2. dans les tailles en collision: empreinte des 4 Kio du début et de la fin;
+# 3. pour les fichiers encore égaux: empreinte du contenu complet.
+#
+# Les lectures se font par readinto() dans un tampon réutilisé (un par thread), et le
+# hachage dans un pool de threads: hashlib relâche le GIL sur les gros blocs, le débit
+# est donc celui du disque, pas celui de Python.
+
+EDGE = 4096          # octets lus au début et à la fin (étage 2)
+CHUNK = 1 << 20      # taille des lectures (étage 3)
+
+_buffers = threading.local()
+
+def read_buffer():
+    # Le tampon du thread courant, alloué une seule fois
+    buf = getattr(_buffers, "buf", None)
+    if buf is None:
+        buf = _buffers.buf = bytearray(CHUNK)
+    return buf
+
+def edge_hash(path, size):
+    # Début + fin du fichier; un petit fichier est lu en entier (l'étage 3 est alors inutile)
+    with open(path, "rb", buffering=0) as f:
+        if size <= 2 * EDGE:
+            return hashlib.blake2b(f.read()).digest()
+        h = hashlib.blake2b(f.read(EDGE))
+        f.seek(-EDGE, os.SEEK_END)
+        h.update(f.read(EDGE))
+        return h.digest()
+
+def full_hash(path):
+    buf = read_buffer()
+    view = memoryview(buf)
+    h = hashlib.blake2b()
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+    return h.digest()
+
+
+def split_by(pool, groups, func, report, step):
+    # Sépare chaque groupe selon func(fichier), en parallèle; ne garde que les groupes de 2+
+    jobs = [(n, f, pool.submit(func, f)) for n, group in enumerate(groups) for f in group]
+    report[step] = len(jobs)
+    buckets = {}
+    for n, f, fut in jobs:
+        try:
+            digest = fut.result()
+        except OSError:
+            report["errors"] += 1  # fichier supprimé ou illisible entre-temps
+            continue
+        buckets.setdefault((n, digest), []).append(f)
+    return [g for g in buckets.values() if len(g) > 1]
+
+def find_duplicates(files, min_size=1, workers=8):
+    # files: FileEntry (scan_directory), Path, FileRow... (stat() + str())
+    # Retourne (groupes de doublons, rapport); un groupe: {"size": octets, "files": [chemins]},
+    # triés par place perdue décroissante.
+    t0 = time.perf_counter()
+    report = {"files": 0, "size_groups": 0, "edge_hashed": 0, "full_hashed": 0,
+              "errors": 0, "wasted_bytes": 0, "seconds": 0.0}
+    by_size = {}
+    for f in files:
+        report["files"] += 1
+        size = f.stat().st_size
+        if size >= min_size:
+            by_size.setdefault(size, []).append(str(f))
+    groups = [g for g in by_size.values() if len(g) > 1]
+    report["size_groups"] = len(groups)
+    sizes = {path: size for size, group in by_size.items() if len(group) > 1 for path in group}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        groups = split_by(pool, groups, lambda path: edge_hash(path, sizes[path]), report, "edge_hashed")
+        small = [g for g in groups if sizes[g[0]] <= 2 * EDGE]   # déjà lus en entier
+        big = [g for g in groups if sizes[g[0]] > 2 * EDGE]
+        groups = small + split_by(pool, big, full_hash, report, "full_hashed")
+
+    groups.sort(key=lambda g: sizes[g[0]] * (len(g) - 1), reverse=True)
+    report["wasted_bytes"] = sum(sizes[g[0]] * (len(g) - 1) for g in groups)
+    report["seconds"] = time.perf_counter() - t0
+    return [{"size": sizes[g[0]], "files": sorted(g)} for g in groups], report
+
+
+def printDuplicates(groups, report):
+    print("--------------------")
+    for g in groups:
+        print(f"{len(g['files'])} copies de {g['size']} octets :")
+        for path in g["files"]:
+            print(f"   {path}")
+    print(f"{len(groups)} groupe(s) de doublons sur {report['files']} fichiers, "
+          f"{report['wasted_bytes']} octets récupérables - {report['edge_hashed']} lectures partielles, "
+          f"{report['full_hashed']} complètes en {report['seconds']:.2f} s")
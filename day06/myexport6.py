@@ -0,0 +1,183 @@
+import csv
+import gzip
+import itertools
+import json
+import threading
+import time
+
+from myutils6 import json_default
+
+# Exports en flux: les lignes sont lues une par une (liste, générateur, FileIndex,
+# Selection...) et écrites par paquets, sans construire la liste complète ni le texte
+# JSON complet en mémoire.
+#
+# - JSON Lines (.jsonl): un objet par ligne, le plus simple à relire en flux;
+# - tableau JSON (.json): compact par défaut, ou indenté comme json.dump(indent=2),
+#   encodé par paquets de BATCH lignes;
+# - CSV (.csv): colonnes prises sur la première ligne si fieldnames n'est pas donné.
+# Un nom terminé par ".gz" (ou compress=True) écrit un fichier gzip.
+#
+#     count = export_file("index.jsonl.gz", index)
+#     job = export_in_background("index.csv", index, progress=print)
+
+BATCH = 1000          # lignes par écriture
+BUFFER = 1 << 20      # tampon du fichier
+
+def open_output(file, compress=None):
+    file = str(file)
+    if compress is None:
+        compress = file.endswith(".gz")
+    if compress:
+        return gzip.open(file, "wt", encoding="utf-8", newline="", compresslevel=6)
+    return open(file, "w", encoding="utf-8", newline="", buffering=BUFFER)
+
+def export_format(file):
+    # "index.jsonl.gz" -> "jsonl"
+    name = str(file).lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    return name.rsplit(".", 1)[-1]
+
+
+def chunks(rows, size=BATCH):
+    # Les lignes par paquets (listes) de size
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+def write_pieces(f, pieces, progress=None, job=None):
+    # pieces: (texte, nombre de lignes qu'il contient); écrit par paquets de ~BATCH lignes.
+    # Retourne le nombre de lignes écrites.
+    count = 0
+    pending = 0
+    batch = []
+    for text, n in pieces:
+        batch.append(text)
+        pending += n
+        if pending >= BATCH or len(batch) >= BATCH:
+            f.write("".join(batch))
+            count += pending
+            pending = 0
+            batch.clear()
+            if job is not None:
+                job.count = count
+                if job.cancelled:
+                    raise ExportCancelled(count)
+            if progress:
+                progress(count)
+    f.write("".join(batch))
+    count += pending
+    if job is not None:
+        job.count = count
+    if progress:
+        progress(count)
+    return count
+
+def jsonl_pieces(rows):
+    encode = json.JSONEncoder(ensure_ascii=False, default=json_default).encode
+    for row in rows:
+        yield encode(row) + "\n", 1
+
+def json_array_pieces(rows, indent=None):
+    # Même texte que json.dump(list(rows), indent=indent): chaque paquet est encodé comme
+    # une liste, puis on recolle les paquets sans leurs crochets
+    if indent is None:
+        encoder = json.JSONEncoder(ensure_ascii=False, default=json_default, separators=(",", ":"))
+        cut, sep = 1, ","          # "[...]"
+    else:
+        encoder = json.JSONEncoder(ensure_ascii=False, default=json_default, indent=indent)
+        cut, sep = 2, ",\n"        # "[\n...\n]"
+    close = None
+    for chunk in chunks(rows):
+        text = encoder.encode(chunk)
+        if close is None:
+            close = text[-cut:]
+            yield text[:-cut], len(chunk)
+        else:
+            yield sep + text[cut:-cut], len(chunk)
+    yield ("[]", 0) if close is None else (close, 0)
+
+class _LineBuffer:
+    # Cible de csv.writer: garde la dernière ligne formatée
+    def write(self, text):
+        self.text = text
+
+def csv_pieces(rows, fieldnames=None):
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return
+    buf = _LineBuffer()
+    writer = csv.DictWriter(buf, fieldnames=fieldnames or list(first.keys()))
+    writer.writeheader()
+    yield buf.text, 0
+    writer.writerow(first)
+    yield buf.text, 1
+    for row in rows:
+        writer.writerow(row)
+        yield buf.text, 1
+
+
+def write_jsonl(file, rows, compress=None, progress=None, job=None):
+    with open_output(file, compress) as f:
+        return write_pieces(f, jsonl_pieces(rows), progress, job)
+
+def write_json_array(file, rows, indent=None, compress=None, progress=None, job=None):
+    with open_output(file, compress) as f:
+        return write_pieces(f, json_array_pieces(rows, indent), progress, job)
+
+def write_csv(file, rows, fieldnames=None, compress=None, progress=None, job=None):
+    with open_output(file, compress) as f:
+        return write_pieces(f, csv_pieces(rows, fieldnames), progress, job)
+
+def export_file(file, rows, fmt=None, progress=None, job=None, **options):
+    # Format pris sur l'extension (jsonl, json, csv; .gz en plus pour compresser)
+    fmt = fmt or export_format(file)
+    if fmt in ("jsonl", "ndjson"):
+        return write_jsonl(file, rows, progress=progress, job=job, **options)
+    if fmt == "json":
+        return write_json_array(file, rows, progress=progress, job=job, **options)
+    if fmt == "csv":
+        return write_csv(file, rows, progress=progress, job=job, **options)
+    raise ValueError(f"format d'export inconnu : {fmt}")
+
+
+class ExportCancelled(Exception):
+    pass
+
+class ExportJob:
+    # Un export lancé dans un thread: job.count (lignes écrites), job.wait(), job.cancel()
+    def __init__(self, file, rows, fmt=None, progress=None, done=None, **options):
+        self.file = file
+        self.count = 0
+        self.error = None
+        self.cancelled = False
+        self.seconds = 0.0
+        self.done = done
+        self.thread = threading.Thread(target=self.run, args=(rows, fmt, progress, options), daemon=True)
+
+    def run(self, rows, fmt, progress, options):
+        t0 = time.perf_counter()
+        try:
+            self.count = export_file(self.file, rows, fmt, progress, self, **options)
+        except Exception as e:   # gardée pour l'appelant (job.error), ExportCancelled compris
+            self.error = e
+        self.seconds = time.perf_counter() - t0
+        if self.done:
+            self.done(self)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def wait(self, timeout=None):
+        self.thread.join(timeout)
+        return not self.thread.is_alive()
+
+def export_in_background(file, rows, fmt=None, progress=None, done=None, **options):
+    # progress(n) et done(job) sont appelés depuis le thread d'export
+    job = ExportJob(file, rows, fmt, progress, done, **options)
+    job.thread.start()
+    return job
@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from myutils6 import readcsv_file, readjson_file, writejson_file
+from myexport6 import export_file
+from myimport6 import iter_records, load_file_index, csv_batches
+
+# Compare readcsv_file / readjson_file (tout en mémoire) aux lecteurs en flux de myimport6:
+# temps et pic mémoire (tracemalloc) pour relire un export de N lignes au format convert_file.
+#
+#     python myimport6-bench.py [N]
+
+def make_records(n):
+    return [{"fullname": f"/data/projet{i % 50}/sous{i % 7}/fichier{i}.txt", "name": f"fichier{i}.txt",
+             "size": i * 37 % 100000, "mtime": 1700000000.0 + i, "date": "2023-11-14T22:13:20",
+             "ext": ".txt", "key": [f"fichier{i}.txt", i * 37 % 100000, 1700000000.0 + i]}
+            for i in range(n)]
+
+def measure(label, func):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label:<42} {seconds:7.2f} s  pic {peak / 1e6:8.1f} Mo  -> {result}")
+
+def consume(rows):
+    # Parcourt sans garder les lignes (ce que fait un traitement en flux)
+    n = 0
+    for _ in rows:
+        n += 1
+    return n
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    records = make_records(n)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_file = os.path.join(tmp, "index.csv")
+        json_file = os.path.join(tmp, "index.json")
+        jsonl_file = os.path.join(tmp, "index.jsonl")
+        export_file(csv_file, records)
+        writejson_file(json_file, records)
+        export_file(jsonl_file, records)
+        export_file(jsonl_file + ".gz", records)
+        del records
+        for f in (csv_file, json_file, jsonl_file, jsonl_file + ".gz"):
+            print(f"{os.path.basename(f):<16} {os.path.getsize(f) / 1e6:8.1f} Mo")
+        print(f"--- {n} lignes")
+        measure("readcsv_file (liste de dicts)", lambda: len(readcsv_file(csv_file)))
+        measure("iter_records csv (flux, types convertis)", lambda: consume(iter_records(csv_file)))
+        measure("csv_batches(10000)", lambda: consume(csv_batches(csv_file)))
+        measure("readjson_file (document entier)", lambda: len(readjson_file(json_file)))
+        measure("iter_records json (tableau en flux)", lambda: consume(iter_records(json_file)))
+        measure("iter_records jsonl", lambda: consume(iter_records(jsonl_file)))
+        measure("iter_records jsonl.gz", lambda: consume(iter_records(jsonl_file + ".gz")))
+        measure("readcsv_file + FileIndex.from_records", lambda: len(load_list_then_index(csv_file)))
+        measure("load_file_index csv", lambda: len(load_file_index(csv_file)))
+        measure("load_file_index json", lambda: len(load_file_index(json_file)))
+
+def load_list_then_index(csv_file):
+    from myindex6 import FileIndex
+    rows = readcsv_file(csv_file)
+    for r in rows:
+        r["size"] = int(r["size"])
+        r["mtime"] = float(r["mtime"])
+    return FileIndex.from_records(rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import csv
+import datetime
+import gzip
+import json
+import re
+
+from myindex6 import FileIndex
+from myexport6 import chunks, export_format
+
+# Lecture en flux des fichiers écrits par myexport6 / writejson_file / writecsv_file:
+# au lieu de readcsv_file (liste de tous les dicts) ou readjson_file (document entier),
+# les lignes arrivent une par une (ou par paquets) et la mémoire reste constante.
+#
+# - CSV: iter_csv / csv_batches (paquets de lignes);
+# - JSON Lines: iter_jsonl;
+# - tableau JSON: iter_json_array, qui décode un élément à la fois (raw_decode) dans
+#   un tampon lu par blocs;
+# - "size" et "mtime" sont convertis (int, float) au passage: le CSV n'a que du texte;
+# - load_file_index charge directement dans un FileIndex (colonnes compactes).
+#
+#     for batch in csv_batches("index.csv.gz", 10000): ...
+#     index = load_file_index("index.jsonl")
+
+READ_SIZE = 1 << 20   # taille des blocs lus par iter_json_array
+BLANKS = re.compile(r"[ \t\r\n]*").match
+
+def open_input(file):
+    # Texte, gzip si le nom finit par ".gz"
+    file = str(file)
+    if file.endswith(".gz"):
+        return gzip.open(file, "rt", encoding="utf-8", newline="")
+    return open(file, "r", encoding="utf-8", newline="")
+
+def coerce_row(row):
+    # "size" -> int, "mtime" -> float (une date ISO, format scan_dir, reste du texte)
+    size = row.get("size")
+    if isinstance(size, str) and size:
+        try:
+            row["size"] = int(size)
+        except ValueError:
+            row["size"] = size_from_text(size, row)
+    mtime = row.get("mtime")
+    if isinstance(mtime, str) and mtime:
+        try:
+            row["mtime"] = float(mtime)
+        except ValueError:
+            pass
+    return row
+
+def size_from_text(size, row):
+    # "12.0" (taille passée par un float, ex: tableur) -> 12; sinon erreur qui nomme la ligne
+    try:
+        value = float(size)
+    except ValueError:
+        value = None
+    if value is None or not value.is_integer():
+        name = row.get("fullname") or row.get("path") or row
+        raise ValueError(f"taille invalide {size!r} pour {name}") from None
+    return int(value)
+
+
+def iter_csv(file, coerce=True):
+    with open_input(file) as f:
+        for row in csv.DictReader(f):
+            yield coerce_row(row) if coerce else row
+
+def iter_jsonl(file, coerce=True):
+    with open_input(file) as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                yield coerce_row(row) if coerce and isinstance(row, dict) else row
+
+def iter_json_array(file, coerce=True):
+    # Les éléments d'un tableau JSON "[{...}, {...}]", un par un
+    decode = json.JSONDecoder().raw_decode
+    with open_input(file) as f:
+        buf = f.read(READ_SIZE)
+        eof = not buf
+        pos = skip_blanks(buf, 0)
+        if pos >= len(buf) or buf[pos] != "[":
+            raise ValueError(f"{file}: pas un tableau JSON")
+        pos += 1
+        comma = False   # après ",", un élément est obligatoire: "[1,]" est refusé
+        while True:
+            pos = skip_blanks(buf, pos)
+            if pos < len(buf) and buf[pos] == "]":
+                if comma:
+                    raise ValueError(f"{file}: élément attendu après ','")
+                return
+            # Un élément n'est sûr que s'il est suivi de "," ou "]": sinon, en fin de tampon,
+            # "12" ou "-2." pourraient être le début de "1234" ou "-2.5"
+            try:
+                row, end = decode(buf, pos)
+                after = skip_blanks(buf, end)
+                if after >= len(buf) or buf[after] not in ",]":
+                    raise ValueError(f"{file}: ',' ou ']' attendu")
+            except ValueError:
+                if eof:
+                    raise
+                more = f.read(READ_SIZE)
+                eof = not more
+                buf = buf[pos:] + more
+                pos = 0
+                continue
+            yield coerce_row(row) if coerce and isinstance(row, dict) else row
+            comma = buf[after] == ","
+            pos = after + 1 if comma else after
+
+def skip_blanks(buf, pos):
+    return BLANKS(buf, pos).end()
+
+
+def iter_records(file, fmt=None, coerce=True):
+    # Format pris sur l'extension, comme export_file
+    fmt = fmt or export_format(file)
+    if fmt == "csv":
+        return iter_csv(file, coerce)
+    if fmt in ("jsonl", "ndjson"):
+        return iter_jsonl(file, coerce)
+    if fmt == "json":
+        return iter_json_array(file, coerce)
+    raise ValueError(f"format inconnu : {fmt}")
+
+def csv_batches(file, size=10000, coerce=True):
+    # Les lignes par listes de size (traitement par paquets, mémoire bornée)
+    return chunks(iter_csv(file, coerce), size)
+
+def load_file_index(file, fmt=None, style=None):
+    # Relit un export (convert_file ou scan_dir) directement dans un FileIndex
+    index = None
+    for row in iter_records(file, fmt):
+        if index is None:
+            index = FileIndex(style or ("convert_file" if "fullname" in row else "scan_dir"))
+        mtime = row["mtime"]
+        if isinstance(mtime, str):   # scan_dir: date ISO
+            mtime = datetime.datetime.fromisoformat(mtime).timestamp()
+        index.add(row.get("fullname") or row["path"], row["size"], mtime)
+    return index if index is not None else FileIndex(style or "convert_file")
@@ -0,0 +1,366 @@
+import os
+import sqlite3
+import time
+from array import array
+from collections.abc import Mapping
+
+from myutils6 import check_pattern, file_suffix, format_mtime
+
+
+# Index persistant (sqlite) d'une arborescence, mis à jour de façon incrémentale.
+#
+# Un dossier dont le mtime n'a pas changé n'a ni gagné ni perdu d'entrée: on ne relit
+# pas son contenu (pas de scandir ni de stat par fichier), on descend seulement dans ses
+# sous-dossiers connus. Un seul stat par dossier suffit donc sur un arbre inchangé.
+#
+# ⚠ Limite: modifier un fichier EN PLACE (même nom) ne change pas le mtime de son dossier.
+# Ces modifications ne sont vues que par update(full=True), qui restat chaque fichier.
+# (Les éditeurs qui écrivent un fichier temporaire puis le renomment, eux, sont détectés.)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path   TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime  INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs(parent);
+CREATE TABLE IF NOT EXISTS files (
+    fullname TEXT PRIMARY KEY,
+    dir      TEXT NOT NULL,
+    name     TEXT NOT NULL,
+    size     INTEGER NOT NULL,
+    mtime    REAL NOT NULL,
+    ext      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files(dir);
+"""
+
+
+UNREADABLE = -1   # mtime enregistré pour un dossier illisible: aucun vrai mtime ne l'égale, il sera relu
+
+class PersistentIndex:
+
+    def __init__(self, dbfile, root):
+        self.root = os.path.abspath(root)
+        self.db = sqlite3.connect(dbfile)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def update(self, full=False):
+        # Met l'index à jour et retourne le rapport:
+        # {"added": [...], "removed": [...], "modified": [...], "scanned_dirs": n, "skipped_dirs": n,
+        #  "unreadable_dirs": [...]}
+        report = {"added": [], "removed": [], "modified": [],
+                  "scanned_dirs": 0, "skipped_dirs": 0, "unreadable_dirs": [], "seconds": 0.0}
+        t0 = time.perf_counter()
+        with self.db:
+            stack = [(self.root, None)]
+            while stack:
+                folder, parent = stack.pop()
+                try:
+                    mtime = os.stat(folder).st_mtime_ns
+                except OSError:
+                    self.remove_tree(folder, report)
+                    continue
+                row = self.db.execute("SELECT mtime FROM dirs WHERE path = ?", (folder,)).fetchone()
+                if row is not None and row[0] == mtime and not full:
+                    report["skipped_dirs"] += 1
+                    for (sub,) in self.db.execute("SELECT path FROM dirs WHERE parent = ?", (folder,)):
+                        stack.append((sub, folder))
+                    continue
+                report["scanned_dirs"] += 1
+                subdirs = self.rescan_dir(folder, report)
+                if subdirs is None:
+                    # Illisible: ses fichiers indexés sont gardés, ses sous-dossiers connus
+                    # sont quand même vérifiés, et il sera relu au prochain update
+                    report["unreadable_dirs"].append(folder)
+                    subdirs = [sub for (sub,) in self.db.execute("SELECT path FROM dirs WHERE parent = ?",
+                                                                  (folder,))]
+                    mtime = UNREADABLE
+                for sub in subdirs:
+                    stack.append((sub, folder))
+                self.db.execute("INSERT OR REPLACE INTO dirs (path, parent, mtime) VALUES (?, ?, ?)",
+                                (folder, parent, mtime))
+        report["seconds"] = time.perf_counter() - t0
+        return report
+
+    def rescan_dir(self, folder, report):
+        # Relit un dossier: compare ses fichiers à l'index, retire les sous-dossiers disparus.
+        # Retourne la liste des sous-dossiers présents, None si le dossier est illisible.
+        known = {name: (size, mtime) for name, size, mtime in
+                 self.db.execute("SELECT name, size, mtime FROM files WHERE dir = ?", (folder,))}
+        subdirs = []
+        seen = set()
+        try:
+            with os.scandir(folder) as it:
+                for e in it:
+                    try:
+                        if e.is_dir(follow_symlinks=False):
+                            subdirs.append(e.path)
+                            continue
+                        if not e.is_file():
+                            continue
+                        st = e.stat()
+                    except OSError:
+                        continue
+                    seen.add(e.name)
+                    old = known.get(e.name)
+                    if old == (st.st_size, st.st_mtime):
+                        continue
+                    report["modified" if old else "added"].append(e.path)
+                    self.db.execute("INSERT OR REPLACE INTO files (fullname, dir, name, size, mtime, ext) "
+                                    "VALUES (?, ?, ?, ?, ?, ?)",
+                                    (e.path, folder, e.name, st.st_size, st.st_mtime, file_suffix(e.name)))
+        except OSError:
+            print(f"Dossier illisible : {folder}")
+            return None
+        for name in known.keys() - seen:
+            fullname = os.path.join(folder, name)
+            report["removed"].append(fullname)
+            self.db.execute("DELETE FROM files WHERE fullname = ?", (fullname,))
+        present = set(subdirs)
+        for (sub,) in self.db.execute("SELECT path FROM dirs WHERE parent = ?", (folder,)).fetchall():
+            if sub not in present:
+                self.remove_tree(sub, report)
+        return subdirs
+
+    def remove_tree(self, folder, report):
+        # Retire un dossier disparu et tout son contenu de l'index
+        prefix = folder + os.sep
+        n = len(prefix)
+        where = "{col} = ? OR substr({col}, 1, ?) = ?"
+        for (fullname,) in self.db.execute("SELECT fullname FROM files WHERE " + where.format(col="dir"),
+                                           (folder, n, prefix)):
+            report["removed"].append(fullname)
+        self.db.execute("DELETE FROM files WHERE " + where.format(col="dir"), (folder, n, prefix))
+        self.db.execute("DELETE FROM dirs WHERE " + where.format(col="path"), (folder, n, prefix))
+
+    def records(self, pattern=None):
+        # Les fichiers indexés, au format de convert_file (fullname, name, size, mtime, date, ext, key);
+        # pattern: filtre sur l'extension comme scan_directory (None = tous)
+        rows = self.db.execute("SELECT fullname, name, size, mtime, ext FROM files ORDER BY fullname")
+        for fullname, name, size, mtime, ext in rows:
+            if pattern is None or check_pattern(ext, pattern):
+                o = {
+                    "fullname": fullname,
+                    "name": name,
+                    "size": size,
+                    "mtime": mtime,
+                    "date": format_mtime(mtime).isoformat(),
+                    "ext": ext
+                }
+                o["key"] = (o["name"], o["size"], o["mtime"])
+                yield o
+
+    def file_index(self, pattern=None, style="convert_file"):
+        # Les fichiers indexés dans un FileIndex (colonnes compactes) au lieu de dicts
+        index = FileIndex(style)
+        for fullname, size, mtime, ext in self.db.execute(
+                "SELECT fullname, size, mtime, ext FROM files ORDER BY fullname"):
+            if pattern is None or check_pattern(ext, pattern):
+                index.add(fullname, size, mtime)
+        return index
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def index_directory(folder, dbfile, pattern=None, full=False):
+    # Remplace scan_directory + convert_files pour les gros arbres relus souvent:
+    # retourne (FileIndex au format convert_file, rapport des changements).
+    # Pas de dict par fichier: les lignes ne sont construites qu'à la lecture (export...)
+    with PersistentIndex(dbfile, folder) as index:
+        report = index.update(full)
+        return index.file_index(pattern), report
+
+
+def printIndexReport(report):
+    print("--------------------")
+    print(f"{len(report['added'])} ajouté(s), {len(report['removed'])} supprimé(s), "
+          f"{len(report['modified'])} modifié(s) - {report['scanned_dirs']} dossier(s) relu(s), "
+          f"{report['skipped_dirs']} inchangé(s) en {report['seconds']:.2f} s")
+    if report["unreadable_dirs"]:
+        print(f"{len(report['unreadable_dirs'])} dossier(s) illisible(s), relu(s) à la prochaine mise à jour")
+
+
+# ---------------------------------------------------------------------------
+# FileIndex: les mêmes informations que convert_file / scan_dir, en colonnes.
+#
+# Au lieu d'un dict (+ un tuple "key" + une date ISO) par fichier:
+# - chaque dossier n'est stocké qu'une fois (table des dossiers), chaque fichier garde
+#   seulement le numéro de son dossier et son nom;
+# - tailles et mtimes dans des array('q') / array('d') (8 octets par valeur);
+# - extensions dans une petite table, un numéro (array('I')) par fichier.
+# index[i] retourne une vue FileRow qui se lit comme le dict d'avant (row["name"],
+# row.get("size"), dict(row)...): "date" et "key" sont calculés à la lecture.
+
+def _fullname(index, i):
+    folder = index.dirs[index.dir_of[i]]
+    if not folder:
+        return index.names[i]
+    if folder[-1] == os.sep:  # racine ("/", "C:\\"): le séparateur en fait déjà partie
+        return folder + index.names[i]
+    return folder + os.sep + index.names[i]
+
+def _iso_seconds(mtime):
+    return format_mtime(mtime).isoformat(timespec="seconds")
+
+# Champs d'une ligne selon le format d'origine
+ROW_FIELDS = {
+    # convert_file (day06)
+    "convert_file": {
+        "fullname": _fullname,
+        "name": lambda index, i: index.names[i],
+        "size": lambda index, i: index.sizes[i],
+        "mtime": lambda index, i: index.mtimes[i],
+        "date": lambda index, i: format_mtime(index.mtimes[i]).isoformat(),
+        "ext": lambda index, i: index.exts[index.ext_of[i]],
+        "key": lambda index, i: (index.names[i], index.sizes[i], index.mtimes[i]),
+    },
+    # scan_dir (bonus/test.py): extension en minuscules, mtime en ISO à la seconde
+    "scan_dir": {
+        "path": _fullname,
+        "name": lambda index, i: index.names[i],
+        "ext": lambda index, i: index.exts[index.ext_of[i]].lower(),
+        "size": lambda index, i: index.sizes[i],
+        "mtime": lambda index, i: _iso_seconds(index.mtimes[i]),
+    },
+}
+
+
+class FileRow(Mapping):
+    # Vue en lecture seule sur la ligne i d'un FileIndex
+    __slots__ = ("index", "i")
+
+    def __init__(self, index, i):
+        self.index = index
+        self.i = i
+
+    def __getitem__(self, key):
+        return self.index.fields[key](self.index, self.i)
+
+    def __iter__(self):
+        return iter(self.index.fields)
+
+    def __len__(self):
+        return len(self.index.fields)
+
+    # Comme FileEntry: utilisable par printListFile, convert_file, sort_by_size...
+    @property
+    def name(self):
+        return self.index.names[self.i]
+
+    @property
+    def suffix(self):
+        return self.index.exts[self.index.ext_of[self.i]]
+
+    @property
+    def st_size(self):
+        return self.index.sizes[self.i]
+
+    @property
+    def st_mtime(self):
+        return self.index.mtimes[self.i]
+
+    def stat(self):
+        return self
+
+    def __fspath__(self):
+        return _fullname(self.index, self.i)
+
+    def __str__(self):
+        return _fullname(self.index, self.i)
+
+    def __repr__(self):
+        return f"FileRow({dict(self)!r})"
+
+
+class FileIndex:
+
+    def __init__(self, style="convert_file"):
+        self.style = style
+        self.fields = ROW_FIELDS[style]
+        self.dirs = []          # table des dossiers
+        self.dir_ids = {}
+        self.dir_of = array("I")
+        self.names = []
+        self.sizes = array("q")
+        self.mtimes = array("d")
+        self.exts = []          # table des extensions
+        self.ext_ids = {}
+        self.ext_of = array("I")
+        self.query_cache = {}   # myquery6: numéros de lignes par requête
+
+    def add(self, fullname, size, mtime):
+        folder, sep, name = str(fullname).rpartition(os.sep)
+        if sep and (not folder or folder[-1] == ":"):
+            folder += sep  # fichier à la racine: "/x.txt" -> dossier "/"
+        d = self.dir_ids.get(folder)
+        if d is None:
+            d = self.dir_ids[folder] = len(self.dirs)
+            self.dirs.append(folder)
+        ext = file_suffix(name)
+        e = self.ext_ids.get(ext)
+        if e is None:
+            e = self.ext_ids[ext] = len(self.exts)
+            self.exts.append(ext)
+        self.dir_of.append(d)
+        self.names.append(name)
+        self.sizes.append(size)
+        self.mtimes.append(mtime)
+        self.ext_of.append(e)
+
+    @classmethod
+    def from_files(cls, files, style="convert_file"):
+        # Depuis scan_directory / scan_entries (FileEntry) ou des Path: un stat par fichier
+        index = cls(style)
+        for f in files:
+            st = f.stat()
+            index.add(str(f), st.st_size, st.st_mtime)
+        return index
+
+    @classmethod
+    def from_records(cls, records, style="convert_file"):
+        # Depuis des dicts convert_file ("fullname") ou scan_dir ("path"); mtime en secondes
+        index = cls(style)
+        for r in records:
+            index.add(r.get("fullname") or r["path"], r["size"], r["mtime"])
+        return index
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [FileRow(self, j) for j in range(len(self))[i]]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("FileIndex index out of range")
+        return FileRow(self, i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield FileRow(self, i)
+
+    def query(self, **options):
+        # Filtre/tri/top-N en une passe, voir myquery6.query
+        from myquery6 import query
+        return query(self, **options)
+
+    def memory(self):
+        # Octets utilisés (approximation: colonnes + chaînes des tables)
+        import sys
+        total = sum(a.buffer_info()[1] * a.itemsize for a in (self.dir_of, self.sizes, self.mtimes, self.ext_of))
+        total += sum(sys.getsizeof(s) for s in self.names) + sys.getsizeof(self.names)
+        total += sum(sys.getsizeof(s) for s in self.dirs) + sum(sys.getsizeof(s) for s in self.exts)
+        return total
@@ -0,0 +1,224 @@
+import datetime
+import functools
+import heapq
+import itertools
+import operator
+import re
+
+from myindex6 import FileRow
+
+# NumPy est optionnel: sans lui, tout se fait en Python pur
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Moteur de requêtes sur un FileIndex (myindex6): filtre + tri + top-N en une fois.
+#
+# - Les filtres (extension, motif sur le nom, tailles, dates) sont appliqués colonne par
+#   colonne, du moins cher au plus cher, chacun sur les lignes gardées par le précédent,
+#   sans dict par ligne ni fonction Python appelée par ligne (compress/map).
+# - L'extension est résolue une fois sur la petite table des extensions, puis comparée
+#   par numéro; les tailles et mtimes sont lus dans les arrays, sans stat().
+# - Tri sur une clé précalculée (colonne), top-N (limit) avec un tas: heapq au lieu
+#   d'un tri complet.
+# - Avec NumPy (et un index assez grand), filtres numériques et tri passent par des
+#   masques et argsort.
+# - query() retourne une Selection: une vue sur les lignes, pas une copie.
+# - Le résultat (les numéros de lignes) est gardé en cache par requête tant que l'index
+#   ne grandit pas.
+#
+#     rows = query(index, ext=".txt", min_size=1024, sort_key="size", desc=True, limit=20)
+
+NUMPY_MIN_ROWS = 10000   # en dessous, la conversion coûte plus qu'elle ne rapporte
+CACHE_SIZE = 32          # requêtes gardées par index
+
+
+def normalize_ext(ext):
+    # "TXT", "txt", ".txt" -> ".txt"; "txt,md" -> {".txt", ".md"}
+    exts = set()
+    for e in ext.split(","):
+        e = e.strip().lower()
+        if e:
+            exts.add(e if e.startswith(".") else "." + e)
+    return exts
+
+def to_timestamp(value):
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.datetime.fromisoformat(value).timestamp()
+    return value
+
+def sort_column(index, sort_key):
+    # La clé de tri de chaque ligne, calculée une seule fois (pas de dict par ligne)
+    if sort_key == "size":
+        return index.sizes
+    if sort_key in ("mtime", "date"):
+        return index.mtimes
+    if sort_key == "name":
+        return index.names
+    if sort_key == "ext":
+        exts = [e.lower() for e in index.exts]
+        return [exts[e] for e in index.ext_of]
+    if sort_key in ("path", "fullname"):
+        return [index.fields[sort_key](index, i) for i in range(len(index))]
+    raise ValueError(f"clé de tri inconnue : {sort_key}")
+
+
+def column_filter(column, test):
+    # Filtre de lignes: garde i si test(column[i]); la boucle reste en C (compress/map)
+    # (sur toutes les lignes, la colonne est parcourue directement, sans indexation)
+    get = column.__getitem__
+    def keep(rows):
+        values = column if len(rows) == len(column) else map(get, rows)
+        return list(itertools.compress(rows, map(test, values)))
+    return keep
+
+def bound_tests(low, high, strict):
+    # Tests "valeur >= low" / "valeur <= high" (> et < si strict), sans lambda par ligne
+    cmp_low, cmp_high = (operator.lt, operator.gt) if strict else (operator.le, operator.ge)
+    tests = []
+    if low is not None:
+        tests.append(functools.partial(cmp_low, low))     # low <= valeur
+    if high is not None:
+        tests.append(functools.partial(cmp_high, high))   # high >= valeur
+    return tests
+
+def select_python(index, ext_ids, rx, min_size, max_size, after, before, strict=False):
+    filters = []
+    if ext_ids is not None:
+        filters.append(column_filter(index.ext_of, ext_ids.__contains__))
+    for test in bound_tests(min_size, max_size, strict):
+        filters.append(column_filter(index.sizes, test))
+    for test in bound_tests(after, before, strict):
+        filters.append(column_filter(index.mtimes, test))
+    if rx is not None:
+        filters.append(column_filter(index.names, rx.search))   # le plus cher en dernier
+    rows = range(len(index))
+    for keep in filters:
+        rows = keep(rows)
+    return list(rows)
+
+def sort_python(index, rows, sort_key, desc, limit):
+    col = sort_column(index, sort_key)
+    if limit is not None and limit < len(rows):
+        pick = heapq.nlargest if desc else heapq.nsmallest
+        return pick(limit, rows, key=col.__getitem__)
+    return sorted(rows, key=col.__getitem__, reverse=desc)
+
+
+def select_numpy(index, ext_ids, rx, min_size, max_size, after, before, strict=False):
+    # Masques sur des vues des arrays (pas de copie); le motif, lui, reste en Python
+    mask = np.ones(len(index), dtype=bool)
+    if ext_ids is not None:
+        mask &= np.isin(np.frombuffer(index.ext_of, dtype=np.uint32), list(ext_ids))
+    sizes = np.frombuffer(index.sizes, dtype=np.int64)
+    mtimes = np.frombuffer(index.mtimes, dtype=np.float64)
+    ge, le = (np.greater, np.less) if strict else (np.greater_equal, np.less_equal)
+    if min_size is not None:
+        mask &= ge(sizes, min_size)
+    if max_size is not None:
+        mask &= le(sizes, max_size)
+    if after is not None:
+        mask &= ge(mtimes, after)
+    if before is not None:
+        mask &= le(mtimes, before)
+    rows = np.flatnonzero(mask)
+    if rx is not None:
+        names = index.names
+        rows = rows[[bool(rx.search(names[i])) for i in rows.tolist()]]
+    return rows
+
+def sort_numpy(index, rows, sort_key, desc, limit):
+    if sort_key == "size":
+        keys = np.frombuffer(index.sizes, dtype=np.int64)[rows]
+    elif sort_key in ("mtime", "date"):
+        keys = np.frombuffer(index.mtimes, dtype=np.float64)[rows]
+    else:  # clés texte: tri Python sur la colonne
+        return sort_python(index, rows.tolist(), sort_key, desc, limit)
+    if desc:
+        keys = -keys
+    if limit is not None and limit < len(rows):
+        # Les limit plus petites clés sans trier le reste; à égalité sur la dernière clé
+        # retenue, les premières lignes gagnent (même résultat que heapq / sorted)
+        if limit == 0:
+            return []
+        kth = np.partition(keys, limit - 1)[limit - 1]
+        candidates = np.flatnonzero(keys <= kth)
+        order = candidates[np.argsort(keys[candidates], kind="stable")][:limit]
+    else:
+        order = np.argsort(keys, kind="stable")
+    return rows[order].tolist()
+
+
+def query_rows(index, ext="", pattern="", min_size=None, max_size=None, after=None, before=None,
+               sort_key=None, desc=False, limit=None, backend=None, strict=False):
+    # Les numéros de lignes qui passent les filtres, dans l'ordre du tri.
+    # ext: ".txt" ou "txt,md" (sans casse); pattern: regex sur le nom (sans casse);
+    # after/before: timestamp, datetime ou date ISO; backend: None (auto), "python" ou "numpy";
+    # strict: bornes exclues (taille > min_size, < max_size; mtime > after, < before)
+    after, before = to_timestamp(after), to_timestamp(before)
+    key = (ext, pattern, min_size, max_size, after, before, sort_key, bool(desc), limit, backend, bool(strict))
+    cache = index.query_cache
+    hit = cache.get(key)
+    if hit is not None and hit[0] == len(index):
+        return hit[1]
+
+    ext_ids = None
+    if ext:
+        wanted = normalize_ext(ext)
+        ext_ids = {i for i, e in enumerate(index.exts) if e.lower() in wanted}
+    rx = re.compile(pattern, re.IGNORECASE) if pattern else None
+    if backend is None:
+        backend = "numpy" if np is not None and len(index) >= NUMPY_MIN_ROWS else "python"
+    if backend == "numpy":
+        if np is None:
+            raise ImportError("backend numpy demandé mais numpy n'est pas installé")
+        rows = select_numpy(index, ext_ids, rx, min_size, max_size, after, before, strict)
+        if sort_key:
+            rows = sort_numpy(index, rows, sort_key, desc, limit)
+        else:
+            rows = rows[:limit].tolist()
+    else:
+        rows = select_python(index, ext_ids, rx, min_size, max_size, after, before, strict)
+        if sort_key:
+            rows = sort_python(index, rows, sort_key, desc, limit)
+        elif limit is not None:
+            rows = rows[:limit]
+
+    rows = tuple(rows)  # partagé par le cache: non modifiable
+    if len(cache) >= CACHE_SIZE:
+        cache.pop(next(iter(cache)))  # la plus ancienne requête
+    cache[key] = (len(index), rows)
+    return rows
+
+class Selection:
+    # Résultat d'une requête: une vue (index, numéros de lignes), sans copie des données.
+    # Se lit comme la liste de dicts d'avant: len(), sel[0]["name"], sel[:5000], for row in sel
+    __slots__ = ("index", "rows")
+
+    def __init__(self, index, rows):
+        self.index = index
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return Selection(self.index, self.rows[i])
+        return FileRow(self.index, self.rows[i])
+
+    def __iter__(self):
+        index = self.index
+        for i in self.rows:
+            yield FileRow(index, i)
+
+    def __repr__(self):
+        return f"Selection({len(self.rows)} lignes)"
+
+def query(index, **options):
+    # Comme query_rows, mais retourne les lignes (FileRow, lues comme des dicts)
+    return Selection(index, query_rows(index, **options))
@@ -2,10 +2,229 @@
 
 from myutils6 import mylog
 from myutils6 import readcsv_file
+from myutils6 import scan_directory
+from myutils6 import scan_entries
+from myutils6 import filter_files_by_size
+from myutils6 import Matcher
+from myutils6 import writejson_file
+import myquery6
+from myquery6 import np, query_rows
+from myindex6 import FileIndex
+from myindex6 import PersistentIndex
+import myimport6
+import myexport6
+import mydupes6
+
+import itertools
+import json
+import os
+import random
+import tempfile
 
 
 assert mylog("this is a test") == True
 
+# scan_directory: fichiers seulement, un stat par fichier, compatible avec Path
+with tempfile.TemporaryDirectory() as tmp:
+    os.makedirs(os.path.join(tmp, "sub"))
+    for name in ("a.txt", "b.md", os.path.join("sub", "c.txt")):
+        with open(os.path.join(tmp, name), "w") as f:
+            f.write("x")
+    found = scan_directory(tmp, "*.txt", True)
+    assert sorted(f.name for f in found) == ["a.txt", "c.txt"]
+    assert all(f.stat().st_size == 1 and f.suffix == ".txt" for f in found)
+    assert [f.name for f in scan_directory(tmp, "*.txt", False)] == ["a.txt"]
+    # Ordre fixe (celui de os.walk), quel que soit l'ordre de fin des threads
+    for i in range(30):
+        os.makedirs(os.path.join(tmp, f"d{i}", "e"))
+        for name in (f"x{i}.txt", os.path.join("e", f"y{i}.txt")):
+            with open(os.path.join(tmp, f"d{i}", name), "w") as f:
+                f.write("x")
+    walk = [os.path.join(root, name) for root, _, names in os.walk(tmp) for name in names if name.endswith(".txt")]
+    for workers in (1, 8, 8, 8):
+        assert [str(f) for f in scan_entries(tmp, "*.txt", True, workers)] == walk
+
+# FileIndex: fichiers à la racine, plus de 65535 extensions différentes
+index = FileIndex()
+for name in (os.sep + "x.txt", os.path.join(os.sep + "a", "y.md"), "rel.txt"):
+    index.add(name, 1, 0.0)
+assert [str(row) for row in index] == [os.sep + "x.txt", os.path.join(os.sep + "a", "y.md"), "rel.txt"]
+for i in range(70000):
+    index.add(f"f.e{i}", 1, 0.0)
+assert index[-1]["ext"] == ".e69999"
+
+# PersistentIndex: un dossier illisible n'est pas marqué à jour, son sous-arbre reste vérifié
+with tempfile.TemporaryDirectory() as tmp:
+    locked = os.path.join(tmp, "locked")
+    os.makedirs(os.path.join(locked, "sub"))
+    for name in ("a.txt", os.path.join("sub", "b.txt")):
+        with open(os.path.join(locked, name), "w") as f:
+            f.write("x")
+    db = os.path.join(tmp, "index.db")
+    scandir = os.scandir
+    def failing_scandir(path):
+        if path == locked:
+            raise PermissionError(path)
+        return scandir(path)
+    with PersistentIndex(db, locked) as pindex:
+        assert len(pindex.update()["added"]) == 2
+        os.scandir = failing_scandir
+        try:
+            with open(os.path.join(locked, "c.txt"), "w") as f:   # change le mtime de locked
+                f.write("x")
+            os.remove(os.path.join(locked, "sub", "b.txt"))
+            report = pindex.update()
+            assert report["unreadable_dirs"] == [locked] and report["removed"] == [os.path.join(locked, "sub", "b.txt")]
+            assert pindex.update()["unreadable_dirs"] == [locked]   # retenté, pas "inchangé"
+        finally:
+            os.scandir = scandir
+        report = pindex.update()
+        assert report["unreadable_dirs"] == [] and report["added"] == [os.path.join(locked, "c.txt")]
+
+# writejson_file: listes et itérateurs de lignes en flux, le reste par json.dump
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "out.json")
+    row = index[0]
+    for value in ([{"a": 1}, {"b": [2]}], {"a": 1}, "texte", 42, None, [], row):
+        for written in (value, iter(value)) if isinstance(value, list) else (value,):
+            writejson_file(path, written)
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+            assert text == json.dumps(dict(value) if value is row else value, indent=2, ensure_ascii=False)
+    writejson_file(path, index)
+    with open(path, encoding="utf-8") as f:
+        assert len(json.load(f)) == len(index)
+
+# Lecture en flux: virgule finale refusée (à toutes les coupures de tampon), tailles "12.0"
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "in.json")
+    read_size = myimport6.READ_SIZE
+    for text, expected in (("[1, 2]", [1, 2]), ("[ ]", []), ("[1,]", None), ("[1, 2 ,\n ]", None), ("[,]", None)):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        for myimport6.READ_SIZE in range(1, len(text) + 1):
+            try:
+                assert list(myimport6.iter_json_array(path)) == expected
+            except ValueError:
+                assert expected is None, text
+            else:
+                assert expected is not None, text
+    myimport6.READ_SIZE = read_size
+    path = os.path.join(tmp, "in.csv")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("fullname,size,mtime\n/a/x.txt,12.0,1.5\n/a/y.txt,1e3,2\n")
+    assert [row["size"] for row in myimport6.iter_csv(path)] == [12, 1000]
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("/a/z.txt,12.5,3\n")
+    try:
+        list(myimport6.iter_csv(path))
+        assert False
+    except ValueError as e:
+        assert "/a/z.txt" in str(e)
+
+# Exports en flux (myexport6) relus par myimport6: formats pris sur l'extension, gzip, ExportJob
+with tempfile.TemporaryDirectory() as tmp:
+    rows = [dict(row) for row in FileIndex.from_records(
+        [{"fullname": f"/d{i % 3}/f{i}.txt", "size": i * 7, "mtime": 1.7e9 + i} for i in range(2500)])]
+    for name in ("i.json", "i.json.gz", "i.jsonl", "i.jsonl.gz", "i.ndjson", "i.csv", "i.csv.gz"):
+        path = os.path.join(tmp, name)
+        assert myexport6.export_file(path, iter(rows)) == len(rows)
+        with open(path, "rb") as f:
+            assert (f.read(2) == b"\x1f\x8b") == name.endswith(".gz")
+        back, expected = list(myimport6.iter_records(path)), json.loads(json.dumps(rows))
+        if name.startswith("i.csv"):   # le CSV n'a que du texte: "key" reste une chaîne
+            assert back[0]["key"] == str(rows[0]["key"])
+            back = [dict(row, key=None) for row in back]
+            expected = [dict(row, key=None) for row in expected]
+        assert back == expected, name
+        index = myimport6.load_file_index(path)
+        assert len(index) == len(rows) and dict(index[-1]) == dict(FileIndex.from_records(rows)[-1])
+    path = os.path.join(tmp, "i.jsonl")
+    assert myexport6.write_jsonl(path, rows[:3]) == 3
+    assert list(myimport6.iter_jsonl(path)) == json.loads(json.dumps(rows[:3])) and myexport6.export_format("A.JSONL.GZ") == "jsonl"
+    try:
+        myexport6.export_file(os.path.join(tmp, "i.txt"), rows)
+        assert False
+    except ValueError:
+        pass
+    # ExportJob: fin normale, erreur gardée dans job.error, annulation; done() appelé à chaque fois
+    finished = []
+    job = myexport6.export_in_background(os.path.join(tmp, "j.csv.gz"), rows, done=finished.append)
+    assert job.wait(10) and job.error is None and job.count == len(rows)
+    job = myexport6.export_in_background(os.path.join(tmp, "j.txt"), rows, done=finished.append)
+    assert job.wait(10) and isinstance(job.error, ValueError)
+    job = myexport6.ExportJob(os.path.join(tmp, "j.jsonl"), rows, done=finished.append)
+    job.cancel()
+    job.thread.start()
+    assert job.wait(10) and isinstance(job.error, myexport6.ExportCancelled) and job.count < len(rows)
+    assert len(finished) == 3 and all(isinstance(j, myexport6.ExportJob) for j in finished)
+
+# find_duplicates: contenu différent au milieu ou à la fin, petits fichiers, tailles uniques, fichiers illisibles
+with tempfile.TemporaryDirectory() as tmp:
+    big = bytes(range(256)) * 80                     # 20480 octets > 2 * EDGE
+    small = bytes(range(256)) * 32                   # 8192 octets = 2 * EDGE, lu en entier à l'étage 2
+    middle = bytearray(big)
+    middle[len(big) // 2] ^= 1                       # même début, même fin
+    end = bytearray(big)
+    end[-1] ^= 1
+    small2 = bytearray(small)
+    small2[4096] ^= 1
+    contents = {"big1": big, "big2": big, "middle": middle, "end": end, "small1": small, "small2": small,
+                "small_diff": small2, "alone": b"x" * 12345, "gone1": b"y" * 100, "gone2": b"y" * 100,
+                "gone3": b"y" * 100}
+    for name, data in contents.items():
+        with open(os.path.join(tmp, name), "wb") as f:
+            f.write(data)
+    files = scan_directory(tmp, "*")
+    os.remove(os.path.join(tmp, "gone1"))            # supprimé entre le scan et la lecture
+    groups, report = mydupes6.find_duplicates(files)
+    found = [[os.path.basename(path) for path in g["files"]] for g in groups]
+    assert found == [["big1", "big2"], ["small1", "small2"], ["gone2", "gone3"]], found
+    assert report["files"] == len(contents) and report["size_groups"] == 3 and report["errors"] == 1
+    assert report["edge_hashed"] == 10              # "alone" (taille unique) n'est jamais lu
+    assert report["full_hashed"] == 3               # big1, big2, middle: "end" écarté dès l'étage 2
+    assert report["wasted_bytes"] == len(big) + len(small) + 100
+
+# Matcher: les virgules séparent les globs, sauf dans une classe [...]
+m = Matcher("*.md,f[,;]*.txt")
+assert m("a.md") and m("f,1.txt") and m("f;1.txt") and not m("fx1.txt")
+assert Matcher("[],]x")("]x") and Matcher("[],]x")(",x") and not Matcher("[],]x")("ax")
+assert Matcher("[!,]*.py,*.md")("a.py") and not Matcher("[!,]*.py,*.md")(",a.py")
+assert Matcher("[a*,*.txt")("x.txt")   # "[" sans "]": littéral, la virgule sépare
+
+# Requêtes: bornes incluses ou exclues (strict), mêmes lignes en Python et en NumPy,
+# égalités comprises pour le tri décroissant et le top-N
+index = FileIndex()
+rnd = random.Random(1)
+for i in range(3000):
+    index.add(f"/d{i % 7}/f{i}.{rnd.choice(('txt', 'md', 'py'))}", rnd.randint(0, 20), float(rnd.randint(0, 9)))
+assert all(row["size"] > 10 for row in filter_files_by_size(index, 10))
+assert list(query_rows(index, min_size=10, max_size=12, backend="python")) == \
+    [i for i in range(len(index)) if 10 <= index.sizes[i] <= 12]
+assert list(query_rows(index, min_size=10, max_size=12, strict=True, backend="python")) == \
+    [i for i in range(len(index)) if index.sizes[i] == 11]
+if np is not None:
+    # Petit index: le chemin numpy est forcé (backend="numpy", puis choix automatique avec un seuil à 0)
+    min_rows = myquery6.NUMPY_MIN_ROWS
+    myquery6.NUMPY_MIN_ROWS = 0
+    filters = [{}, {"ext": "txt,md"}, {"pattern": "f1"}, {"min_size": 5, "max_size": 15},
+               {"after": 3, "before": 6}, {"ext": ".py", "min_size": 3, "after": 2, "pattern": "2"}]
+    for options, strict, sort_key, desc, limit in itertools.product(
+            filters, (False, True), (None, "size", "mtime", "name"), (False, True), (None, 0, 1, 17, 5000)):
+        python = query_rows(index, strict=strict, sort_key=sort_key, desc=desc, limit=limit, backend="python", **options)
+        for backend in ("numpy", None):
+            numpy = query_rows(index, strict=strict, sort_key=sort_key, desc=desc, limit=limit, backend=backend, **options)
+            assert python == numpy, (options, strict, sort_key, desc, limit, backend)
+    myquery6.NUMPY_MIN_ROWS = min_rows
+    print("parité python/numpy: ok")
+else:
+    try:
+        query_rows(index, backend="numpy")
+        assert False
+    except ImportError:
+        pass
+    print("numpy absent: parité python/numpy NON testée (backend numpy sauté)")
+
 
 
 
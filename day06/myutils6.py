@@ -2,12 +2,15 @@
 from pathlib import Path
 import re
 import re, fnmatch
+import functools
 
 import datetime
 import json
 import csv
 
 import time
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 def mylog(msg, quiet=False, logfile="log.txt"):
     line = f"{time.strftime('%H:%M:%S')} | {msg}"
@@ -32,12 +35,10 @@ def readcsv_file(file):
         
         
 def writecsv_file(file, rows):
+    # rows: liste, générateur, FileIndex...: écrit en flux (voir myexport6), colonnes de la 1re ligne
+    from myexport6 import write_csv
     try:
-        with open(file, "w", newline="", encoding="utf-8") as f:
-            cles = rows[0].keys() 
-            writer = csv.DictWriter(f, fieldnames=cles)
-            writer.writeheader()
-            writer.writerows(rows)
+        write_csv(file, rows)
 
     except FileExistsError:
         print("Fichier introubable !")
@@ -57,9 +58,25 @@ def readjson_file(file):
     except UnboundLocalError:
         print("Encodage invalide")
 
+def json_default(o):
+    # Pour json.dump: vues de lignes (FileRow) -> dict, conteneurs (FileIndex) -> list
+    if hasattr(o, "keys"):
+        return dict(o)
+    return list(o)
+
 def writejson_file(file, row):
-    with open(file, "w", encoding="utf-8") as f:
-        json.dump(row, f, indent=2, ensure_ascii=False)
+    # Une liste de lignes (ou un générateur, un FileIndex, une Selection) est écrite en flux,
+    # élément par élément, avec le même texte que json.dump(indent=2);
+    # tout le reste (dict, FileRow, texte, nombre, None) est écrit d'un bloc par json.dump
+    from collections.abc import Iterator
+    from myindex6 import FileIndex
+    from myquery6 import Selection
+    if isinstance(row, (list, tuple, FileIndex, Selection, Iterator)):
+        from myexport6 import write_json_array
+        write_json_array(file, row, indent=2, compress=False)
+    else:
+        with open(file, "w", encoding="utf-8") as f:
+            json.dump(row, f, indent=2, ensure_ascii=False, default=json_default)
    
 
 def writefile(filename, txt):
@@ -89,34 +106,211 @@ def scan_dir2(sdir, pattern):
     return files 
 
 
+def is_glob(pattern):
+    return any(ch in pattern for ch in "*?[]")   # ça ressemble à une glob
+
+def split_globs(pattern):
+    # "*.md,f[,;]*" -> ["*.md", "f[,;]*"]: une virgule dans [...] fait partie de la classe.
+    # Comme fnmatch: "]" juste après "[" ou "[!" est un caractère, un "[" sans "]" est littéral.
+    parts = []
+    start = i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "[":
+            j = i + 1
+            if j < len(pattern) and pattern[j] == "!":
+                j += 1
+            if j < len(pattern) and pattern[j] == "]":
+                j += 1
+            j = pattern.find("]", j)
+            if j >= 0:
+                i = j
+        elif ch == ",":
+            parts.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    parts.append(pattern[start:])
+    return parts
+
+class Matcher:
+    # Un pattern analysé et compilé UNE fois, puis appliqué à chaque fichier: m(text) -> bool
+    # - glob ("*.txt") comme fnmatch, regex ("^rap") comme re.search (sans casse par défaut);
+    # - liste de globs séparées par des virgules: "*.md,*.txt" (hors [...]: "f[,;]*");
+    # - les globs "*.ext" deviennent un set de suffixes (une recherche dans un set),
+    #   les autres globs sont réunies en une seule regex.
+    __slots__ = ("pattern", "suffixes", "regex", "search", "fold")
+
+    def __init__(self, pattern, ignorecase=True, regex_first=False):
+        # regex_first: une regex valide reste une regex ("f[0-9]"), glob sinon ("*.md")
+        self.pattern = pattern
+        self.suffixes = set()
+        self.regex = None
+        self.search = None
+        # fnmatch suit la casse du système (os.path.normcase): insensible sous Windows
+        self.fold = os.path.normcase("A") == "a"
+        flags = re.IGNORECASE if ignorecase else 0
+        if regex_first:
+            try:
+                self.search = re.compile(pattern, flags).search
+                return
+            except re.error:
+                pass
+        parts = [p.strip() for p in split_globs(pattern)]
+        if not is_glob(pattern) or not all(p and is_glob(p) for p in parts):
+            # une regex (les virgules en font partie, ex: "a{1,3}")
+            self.search = re.compile(pattern, flags).search
+            return
+        globs = []
+        for p in parts:
+            ext = p[1:]
+            if p.startswith("*.") and not is_glob(ext) and ext.count(".") == 1:
+                self.suffixes.add(ext.lower() if self.fold else ext)
+            else:
+                globs.append(fnmatch.translate(p))
+        if globs:
+            self.regex = re.compile("|".join(globs), re.IGNORECASE if self.fold else 0)
+
+    def __call__(self, text):
+        if self.suffixes:
+            if self.fold:
+                text = text.lower()
+            i = text.rfind(".")
+            if i >= 0 and text[i:] in self.suffixes:
+                return True
+        if self.regex is not None:
+            return self.regex.match(text) is not None
+        if self.search is not None:
+            return self.search(text) is not None
+        return False
+
+    def __repr__(self):
+        return f"Matcher({self.pattern!r})"
+
+@functools.lru_cache(maxsize=256)
+def compile_matcher(pattern, ignorecase=True, regex_first=False):
+    return Matcher(pattern, ignorecase, regex_first)
+
 def check_pattern(text, pattern):
-    if any(ch in pattern for ch in "*?[]"):       # ça ressemble à une glob
-        return fnmatch.fnmatch(text, pattern)
-    return bool(re.search(pattern, text, re.IGNORECASE))
+    return compile_matcher(pattern)(text)
 
-def scan_directory(folder, pattern="**/*", recur=False):
-    liste = []
+class FileEntry:
+    # Un fichier scanné: nom, taille, mtime et extension lus UNE fois (os.scandir).
+    # Se comporte comme un Path pour les fonctions ci-dessous: f.name, f.suffix,
+    # f.stat().st_size / st_mtime (sans appel système), str(f) et open(f).
+    __slots__ = ("path", "name", "size", "mtime", "ext")
 
-    if recur == True: 
-        files = Path(folder).glob("**/*")
-    else:
-        files = Path(folder).iterdir()
+    def __init__(self, path, name, size, mtime, ext):
+        self.path = path
+        self.name = name
+        self.size = size
+        self.mtime = mtime
+        self.ext = ext
 
-    for f in files:
-        if ( check_pattern(f.suffix, pattern) ):
-            liste.append(f)
+    @property
+    def suffix(self):
+        return self.ext
+
+    @property
+    def st_size(self):
+        return self.size
+
+    @property
+    def st_mtime(self):
+        return self.mtime
+
+    def stat(self):
+        return self
+
+    def __fspath__(self):
+        return self.path
 
+    def __str__(self):
+        return self.path
+
+    def __repr__(self):
+        return f"FileEntry({self.path!r}, size={self.size})"
+
+
+def file_suffix(name):
+    # Même règle que Path.suffix: ".bashrc" et "a." n'ont pas d'extension
+    i = name.rfind(".")
+    if 0 < i < len(name) - 1:
+        return name[i:]
+    return ""
+
+
+def scan_one_dir(folder, pattern):
+    # Un seul dossier: (fichiers qui correspondent au pattern, sous-dossiers)
+    match = compile_matcher(pattern)
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(folder) as it:
+            for e in it:
+                try:
+                    if e.is_dir(follow_symlinks=False):
+                        subdirs.append(e.path)
+                        continue
+                    if not e.is_file():
+                        continue
+                    ext = file_suffix(e.name)
+                    if match(ext):
+                        st = e.stat()  # gratuit sous Windows, un seul stat ailleurs
+                        files.append(FileEntry(e.path, e.name, st.st_size, st.st_mtime, ext))
+                except OSError:
+                    pass  # fichier supprimé entre-temps, lien cassé...
+    except (PermissionError, FileNotFoundError, NotADirectoryError):
+        print(f"Dossier illisible : {folder}")
+    return files, subdirs
+
+
+def scan_entries(folder, pattern="**/*", recur=False, workers=8):
+    # Comme scan_directory, mais avec os.scandir: chaque fichier n'est stat() qu'une fois,
+    # et les sous-dossiers sont répartis sur un pool de threads (l'attente disque se fait
+    # en parallèle). Retourne des FileEntry (fichiers seulement) dans un ordre fixe, celui
+    # de os.walk: les fichiers d'un dossier, puis chaque sous-dossier (ordre de scandir),
+    # quel que soit l'ordre dans lequel les threads finissent.
+    files, subdirs = scan_one_dir(folder, pattern)
+    if not recur:
+        return files
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(scan_one_dir, d, pattern): d for d in subdirs}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                d = pending.pop(fut)
+                results[d] = fut.result()
+                for sub in results[d][1]:
+                    pending[pool.submit(scan_one_dir, sub, pattern)] = sub
+    liste = list(files)
+    stack = subdirs[::-1]
+    while stack:
+        files, subdirs = results.pop(stack.pop())
+        liste.extend(files)
+        stack.extend(subdirs[::-1])
     return liste
 
+
+def scan_directory(folder, pattern="**/*", recur=False):
+    # Fichiers du dossier (et des sous-dossiers si recur) dont l'extension correspond
+    # au pattern; voir scan_entries
+    return scan_entries(folder, pattern, recur)
+
 def filter_files_by_pattern(files, pattern):
+    # Regex (sensible à la casse) sur le chemin complet; sinon glob ou "*.md,*.txt"
     newlist=[]
-    pat = re.compile(pattern)
+    match = compile_matcher(pattern, ignorecase=False, regex_first=True)
     for f in files:
-        if pat.search(str(f)):
+        if match(str(f)):
             newlist.append(f)
     return newlist
 
+# Un FileIndex (myindex6) passe par son moteur de requêtes (colonnes, sans stat ni copie);
+# une liste de fichiers garde le parcours simple.
 def filter_files_by_size(listefichier, sizeoctet):
+    if hasattr(listefichier, "query"):
+        return listefichier.query(min_size=sizeoctet, strict=True)  # taille > sizeoctet
     newlist = []
     for f in listefichier:
         if f.stat().st_size > sizeoctet:
@@ -124,16 +318,21 @@ def filter_files_by_size(listefichier, sizeoctet):
     return newlist
 
 def sort_by_date(listefile):
+    if hasattr(listefile, "query"):
+        return listefile.query(sort_key="mtime")
     return sorted(listefile, key=lambda x: x.stat().st_mtime)
 
 def sort_by_size(listefile):
+    if hasattr(listefile, "query"):
+        return listefile.query(sort_key="size")
     return sorted(listefile, key=lambda x: x.stat().st_size)
 
 def printListFile(liste,title=""):
     print("--------------------")
     print(title)
     for f in liste:
-        print(f"Fichier : {f} - size={f.stat().st_size} - {format_mtime(f.stat().st_mtime)}" )
+        st = f.stat()
+        print(f"Fichier : {f} - size={st.st_size} - {format_mtime(st.st_mtime)}" )
 
 def printMyFile(listeObject):
     print("--------------------")
@@ -148,12 +347,13 @@ def convert_files(liste):
     return [convert_file(f) for f in liste ]
 
 def convert_file(f):
+    st = f.stat()
     o = {
         "fullname": str(f),
         "name": str(f.name),
-        "size": f.stat().st_size,
-        "mtime": f.stat().st_mtime,
-        "date": format_mtime(f.stat().st_mtime  ).isoformat(),
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "date": format_mtime(st.st_mtime).isoformat(),
         "ext": f.suffix
     }
     o["key"] = (o["name"], o["size"], o["mtime"])